@@ -0,0 +1,125 @@
+# bench_attrs.py - Análisis de atributos en marcado con muchos atributos
+#
+# Compara el _parse_attrs original (concatenación carácter a carácter) con el
+# analizador por porciones, tanto aislado como dentro de find_all con filtro de
+# clase, donde además solo se analizan los atributos buscados.
+#
+# Uso: python benchmarks/bench_attrs.py [filas] [columnas]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from microbs4 import MicroBS4
+
+
+class LegacyMicroBS4(MicroBS4):
+    """MicroBS4 con el _parse_attrs anterior (referencia); ignora 'names'."""
+
+    def _parse_attrs(self, attrs_str, names=None):
+        if not attrs_str:
+            return {}
+        attrs = {}
+        i = 0
+        current_attr = ""
+        in_value = False
+        quote_char = None
+        value = ""
+
+        while i < len(attrs_str):
+            char = attrs_str[i]
+            if in_value:
+                if char == quote_char:
+                    in_value = False
+                    attrs[current_attr.strip()] = value
+                    current_attr = ""
+                    value = ""
+                else:
+                    value += char
+            elif char == '=':
+                current_attr = current_attr.strip()
+                i += 1
+                while i < len(attrs_str) and attrs_str[i].isspace():
+                    i += 1
+                if i < len(attrs_str) and attrs_str[i] in ['"', "'"]:
+                    quote_char = attrs_str[i]
+                    in_value = True
+                    i += 1
+                    continue
+                else:
+                    value_end = i
+                    while value_end < len(attrs_str) and not attrs_str[value_end].isspace():
+                        value_end += 1
+                    attrs[current_attr] = attrs_str[i:value_end]
+                    i = value_end
+                    current_attr = ""
+                    continue
+            elif char.isspace():
+                if current_attr:
+                    attrs[current_attr.strip()] = True
+                    current_attr = ""
+            else:
+                current_attr += char
+            i += 1
+
+        if current_attr:
+            attrs[current_attr.strip()] = True
+
+        return attrs
+
+
+def cell_attrs(row, col):
+    """Atributos de una celda: 12 atributos, una de cada 10 celdas con clase 'hot'."""
+    hot = " hot" if (row * 7 + col) % 10 == 0 else ""
+    return (f'id="c{row}-{col}" class="cell col-{col}{hot}" data-row="{row}" '
+            f'data-col="{col}" data-value="{row * col}" data-sort="{col}-{row}" '
+            f'title="Celda {row}, {col}" headers="h{col}" scope="row" '
+            f'style="text-align:right;padding:2px" tabindex=-1 aria-selected="false"')
+
+
+def table_document(rows, cols):
+    out = ["<table>"]
+    for row in range(rows):
+        out.append("<tr>")
+        for col in range(cols):
+            out.append(f"<td {cell_attrs(row, col)}>{row * col}</td>")
+        out.append("</tr>")
+    out.append("</table>")
+    return "".join(out)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    cols = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    samples = [cell_attrs(row, col) for row in range(rows) for col in range(cols)]
+    html = table_document(rows, cols)
+
+    legacy = LegacyMicroBS4("")
+    current = MicroBS4("")
+    cases = [
+        ("_parse_attrs", lambda soup: [soup._parse_attrs(s) for s in samples], legacy, current),
+        ("find_all td.hot", lambda soup: soup.find_all("td", class_name="hot"),
+         LegacyMicroBS4(html, cache_size=0), MicroBS4(html, cache_size=0)),
+        ("select td.hot", lambda soup: soup.select("td.hot"),
+         LegacyMicroBS4(html, cache_size=0), MicroBS4(html, cache_size=0)),
+    ]
+
+    print(f"{rows * cols} celdas con 12 atributos")
+    print(f"{'caso':<18}{'antes (s)':>12}{'después (s)':>14}{'aceleración':>14}")
+    for label, fn, before_soup, after_soup in cases:
+        before, expected = timed(lambda: fn(before_soup))
+        after, found = timed(lambda: fn(after_soup))
+        assert len(expected) == len(found)
+        print(f"{label:<18}{before:>12.4f}{after:>14.4f}{before / after:>13.1f}x")
+
+
+if __name__ == "__main__":
+    main()
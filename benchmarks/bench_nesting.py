@@ -0,0 +1,108 @@
+# bench_nesting.py - Escalado de la resolución de etiquetas de cierre
+#
+# Compara el recorrido original de _find_matching_end_tag (una pasada hacia
+# delante por cada etiqueta de apertura, cuadrático en documentos anidados)
+# con la tabla de pares resuelta con una pila en una sola pasada.
+#
+# Uso: python benchmarks/bench_nesting.py [profundidad] [anchura] [max_antes]
+#
+# Los atributos se comprueban antes de buscar el cierre, así que solo se
+# empareja el elemento 'leaf': la tabla de pares lo resuelve desde su propia
+# apertura, como el recorrido original, y no debe quedar por detrás de él en
+# ninguno de los dos documentos. Cada tiempo es el mejor de varias
+# repeticiones. "antes" solo se mide hasta 'max_antes' niveles de
+# profundidad (por defecto, todos).
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from microbs4 import MicroBS4
+
+
+class LegacyMicroBS4(MicroBS4):
+    """MicroBS4 con el recorrido anterior de _find_matching_end_tag (referencia)."""
+
+    def _find_matching_end_tag(self, tag, start_pos):
+        tag_open = f"<{tag}"
+        tag_close = f"</{tag}>"
+        nesting_level = 1
+        pos = start_pos
+
+        while nesting_level > 0 and pos < self.length:
+            next_open = self.html.find(tag_open, pos)
+            next_close = self.html.find(tag_close, pos)
+
+            if next_close == -1:
+                return -1
+
+            if next_open == -1 or next_close < next_open:
+                nesting_level -= 1
+                pos = next_close + len(tag_close)
+            else:
+                tag_attr_pos = next_open + len(tag_open)
+                if (tag_attr_pos < self.length and
+                    self.html[tag_attr_pos] in [' ', '>', '\t', '\n', '/']):
+                    gt_pos = self.html.find(">", next_open)
+                    if gt_pos == -1:
+                        return -1
+                    if self.html[gt_pos - 1] != '/':
+                        nesting_level += 1
+                    pos = gt_pos + 1
+                else:
+                    pos = next_open + 1
+
+        if nesting_level == 0:
+            return pos - len(tag_close)
+        return -1
+
+
+def deep_document(depth):
+    """<div> anidados 'depth' niveles; solo el más interno tiene la clase 'leaf'."""
+    return ("<div>" * (depth - 1) + '<div class="leaf">x</div>' + "</div>" * (depth - 1))
+
+
+def wide_document(width):
+    """Un contenedor con 'width' <div> hermanos; el último tiene la clase 'leaf'."""
+    return ("<div>" + "<div>x</div>" * (width - 1) + '<div class="leaf">x</div>' + "</div>")
+
+
+def run(cls, html, repeat=5):
+    """Mejor tiempo (s) de find_all('div', class_name='leaf') y número de resultados."""
+    best = None
+    for _ in range(repeat):
+        soup = cls(html)
+        t0 = time.perf_counter()
+        found = soup.find_all("div", class_name="leaf")
+        elapsed = time.perf_counter() - t0
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, len(found)
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    max_before = int(sys.argv[3]) if len(sys.argv) > 3 else depth
+    cases = []
+    for size in (depth // 4, depth // 2, depth):
+        cases.append((f"deep {size}", deep_document(size), size <= max_before))
+    for size in (width // 4, width // 2, width):
+        cases.append((f"wide {size}", wide_document(size), True))
+
+    print(f"{'documento':<14}{'antes (s)':>12}{'después (s)':>14}{'aceleración':>14}")
+    for label, html, measure_before in cases:
+        after, n_after = run(MicroBS4, html)
+        assert n_after == 1
+        if not measure_before:
+            print(f"{label:<14}{'-':>12}{after:>14.4f}{'-':>14}")
+            continue
+        before, n_before = run(LegacyMicroBS4, html)
+        assert n_before == n_after
+        print(f"{label:<14}{before:>12.4f}{after:>14.4f}{before / after:>13.1f}x")
+
+
+if __name__ == "__main__":
+    main()
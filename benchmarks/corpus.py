@@ -0,0 +1,141 @@
+# corpus.py - Documentos HTML sintéticos y deterministas para las pruebas de rendimiento
+#
+# Cada generador recibe un factor de escala y devuelve siempre el mismo texto
+# (usa su propio generador congruencial, no el módulo random), de modo que los
+# resultados son comparables entre ejecuciones, máquinas y entre CPython y el
+# puerto unix de MicroPython.
+
+
+class _Rng:
+    """Generador congruencial lineal mínimo (mismos números en cualquier intérprete)."""
+    def __init__(self, seed):
+        self.state = seed
+
+    def next(self, n):
+        self.state = (self.state * 1103515245 + 12345) & 0x7FFFFFFF
+        return (self.state >> 16) % n
+
+
+_WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing",
+          "elit", "sed", "do", "eiusmod", "tempor", "incididunt", "ut", "labore",
+          "et", "dolore", "magna", "aliqua", "año", "niño", "&amp;", "&lt;b&gt;")
+
+
+def _words(rng, count):
+    return " ".join(_WORDS[rng.next(len(_WORDS))] for _ in range(count))
+
+
+def deep(scale=1):
+    """<div> anidados 300 * scale niveles con un párrafo en cada nivel."""
+    depth = 300 * scale
+    out = []
+    for i in range(depth):
+        out.append(f'<div class="level l{i % 10}"><p>nivel {i}</p>')
+    out.append('<span class="leaf">hoja</span>')
+    out.append("</div>" * depth)
+    return "".join(out)
+
+
+def wide(scale=1):
+    """Una lista con 2000 * scale elementos hermanos."""
+    rng = _Rng(2)
+    out = ['<html><body><ul id="list" class="items">']
+    for i in range(2000 * scale):
+        extra = " selected" if rng.next(20) == 0 else ""
+        out.append(f'<li class="item{extra}"><a href="/item/{i}">Elemento {i}</a></li>')
+    out.append("</ul></body></html>")
+    return "".join(out)
+
+
+def table(scale=1):
+    """Tabla de 300 * scale filas x 8 columnas con muchos atributos por celda."""
+    rng = _Rng(3)
+    out = ['<html><body><table id="data" class="grid"><tbody>']
+    for row in range(300 * scale):
+        out.append(f'<tr id="r{row}" class="row {"odd" if row % 2 else "even"}" data-row="{row}">')
+        for col in range(8):
+            hot = " hot" if rng.next(10) == 0 else ""
+            out.append(f'<td class="cell c{col}{hot}" data-col="{col}" data-value="{rng.next(1000)}" '
+                       f'title="Celda {row}:{col}" style="text-align:right" tabindex=-1>'
+                       f'{rng.next(100000)}</td>')
+        out.append("</tr>")
+    out.append("</tbody></table></body></html>")
+    return "".join(out)
+
+
+def text(scale=1):
+    """Artículo largo: 400 * scale párrafos de texto con entidades, enlaces y énfasis."""
+    rng = _Rng(4)
+    out = ["<html><head><title>Artículo</title><style>p { margin: 0 }</style></head>",
+           '<body><article id="main">']
+    for i in range(400 * scale):
+        if i % 25 == 0:
+            out.append(f"<h2>Sección {i // 25}</h2>")
+        out.append(f"<p>{_words(rng, 30)} <a href=\"/ref/{i}\">{_words(rng, 2)}</a> "
+                   f"<em>{_words(rng, 3)}</em> {_words(rng, 20)}</p>")
+    out.append("</article><script>var x = '<p>no</p>';</script></body></html>")
+    return "".join(out)
+
+
+def malformed(scale=1):
+    """Marcado roto típico: etiquetas sin cerrar, cierres sueltos, atributos sin comillas."""
+    rng = _Rng(5)
+    out = ['<html><body><div id="content">']
+    for i in range(500 * scale):
+        kind = rng.next(6)
+        if kind == 0:
+            out.append(f"<p>párrafo sin cerrar {i}")
+        elif kind == 1:
+            out.append(f"<li class=item>{_words(rng, 3)}")
+        elif kind == 2:
+            out.append(f"</span></div><br><img src=/img/{i}.png alt=imagen>")
+        elif kind == 3:
+            out.append(f"<!-- <div class=\"item\">comentado {i}</div> -->")
+        elif kind == 4:
+            out.append(f'<div class="item"><span>{_words(rng, 4)}</div>')
+        else:
+            out.append(f"<a href='/x/{i}' class=\"link\">{_words(rng, 2)}</a>")
+    out.append("</body></html>")
+    return "".join(out)
+
+
+def listing(scale=1):
+    """Página de catálogo con forma real: cabecera, tarjetas de producto y pie."""
+    rng = _Rng(6)
+    out = ['<!DOCTYPE html><html><head><meta charset="utf-8"><title>Catálogo</title>',
+           '<link rel="stylesheet" href="/app.css"></head><body>',
+           '<header><nav><ul class="menu"><li><a href="/">Inicio</a></li>',
+           '<li><a href="/ofertas">Ofertas</a></li></ul></nav></header><main id="catalog">']
+    for i in range(500 * scale):
+        price = rng.next(10000)
+        sale = " on-sale" if rng.next(5) == 0 else ""
+        out.append(f'<div class="product card{sale}" data-id="{i}"><a href="/p/{i}">'
+                   f'<img src="/img/{i}.jpg" alt="Producto {i}"/></a>'
+                   f'<h3 class="title">{_words(rng, 4)}</h3>'
+                   f'<span class="price">{price // 100},{price % 100:02d} €</span>'
+                   f'<ul class="tags"><li>{_words(rng, 1)}</li><li>{_words(rng, 1)}</li></ul></div>')
+    out.append('</main><footer><p>&copy; Tienda</p></footer></body></html>')
+    return "".join(out)
+
+
+# Nombre -> (generador, consultas). Las consultas usan los nombres de la API pública:
+#   find / find_all: (etiqueta, clase o None)
+#   select / select_one: selector CSS
+#   root: selector del elemento para get_text y children
+CORPORA = {
+    "deep": (deep, {"find": ("span", "leaf"), "find_all": ("p", None),
+                    "select": "div.l3 > p", "select_one": "span.leaf", "root": "div"}),
+    "wide": (wide, {"find": ("li", "selected"), "find_all": ("li", "item"),
+                    "select": "ul#list > li a[href]", "select_one": "li.selected a",
+                    "root": "ul"}),
+    "table": (table, {"find": ("td", "hot"), "find_all": ("td", "hot"),
+                      "select": "tr.odd td.hot", "select_one": "td.c7.hot", "root": "tbody"}),
+    "text": (text, {"find": ("em", None), "find_all": ("a", None),
+                    "select": "article p a[href^=/ref]", "select_one": "h2", "root": "article"}),
+    "malformed": (malformed, {"find": ("a", "link"), "find_all": ("div", "item"),
+                              "select": "div.item span", "select_one": "img[alt]",
+                              "root": "body"}),
+    "listing": (listing, {"find": ("div", "on-sale"), "find_all": ("span", "price"),
+                          "select": "div.product.on-sale span.price",
+                          "select_one": "main > div.card h3", "root": "main"}),
+}
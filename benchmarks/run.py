@@ -0,0 +1,168 @@
+# run.py - Suite de rendimiento de la API pública de MicroBS4
+#
+# Mide find, find_all, select, select_one, get_text y children sobre los
+# documentos de corpus.py e informa de operaciones por segundo y memoria. En
+# CPython la memoria es el pico de tracemalloc; en MicroPython (sin
+# tracemalloc) son los bytes asignados durante la operación según gc.mem_alloc.
+#
+# Uso (CPython o puerto unix de MicroPython):
+#   python benchmarks/run.py [--scale N] [--time S] [--only texto]
+#                            [--save base.json] [--compare base.json] [--tolerance 0.1]
+#
+# Con --compare se muestra la variación respecto a una ejecución guardada con
+# --save y el proceso termina con código 1 si alguna operación es más lenta que
+# la base en más de 'tolerance'. No usa argparse ni os.path, que no existen en
+# MicroPython.
+
+import gc
+import json
+import sys
+
+_HERE = __file__.rsplit("/", 1)[0] if "/" in __file__ else "."
+sys.path.insert(0, _HERE)
+sys.path.insert(0, _HERE + "/..")
+
+from corpus import CORPORA
+from microbs4 import MicroBS4
+
+try:
+    from time import ticks_diff, ticks_us
+
+    def _elapsed(t0):
+        """Segundos desde 't0' (ticks_us en MicroPython)."""
+        return ticks_diff(ticks_us(), t0) / 1000000
+
+    _now = ticks_us
+except ImportError:
+    from time import perf_counter as _now
+
+    def _elapsed(t0):
+        return _now() - t0
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+API = ("find", "find_all", "select", "select_one", "get_text", "children")
+
+
+def operations(html, queries):
+    """Nombre de la API -> función sin argumentos que la ejecuta sobre un documento nuevo."""
+    tag, class_name = queries["find"]
+    all_tag, all_class = queries["find_all"]
+    root = queries["root"]
+    return {
+        "find": lambda: MicroBS4(html).find(tag, class_name=class_name),
+        "find_all": lambda: MicroBS4(html).find_all(all_tag, class_name=all_class),
+        "select": lambda: MicroBS4(html).select(queries["select"]),
+        "select_one": lambda: MicroBS4(html).select_one(queries["select_one"]),
+        "get_text": lambda: MicroBS4(html).select_one(root).get_text(),
+        "children": lambda: MicroBS4(html).select_one(root).children(),
+    }
+
+
+def ops_per_second(fn, min_time):
+    """Repite 'fn' durante al menos 'min_time' segundos y devuelve ejecuciones por segundo."""
+    fn()  # calentamiento (compilación de selectores, importaciones)
+    runs = 0
+    t0 = _now()
+    while True:
+        fn()
+        runs += 1
+        elapsed = _elapsed(t0)
+        if elapsed >= min_time:
+            return runs / elapsed
+
+
+def memory(fn):
+    """Pico de memoria (tracemalloc) o bytes asignados (MicroPython) de una ejecución de 'fn'."""
+    gc.collect()
+    if tracemalloc is not None:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+    gc.disable()
+    try:
+        before = gc.mem_alloc()
+        fn()
+        return gc.mem_alloc() - before
+    finally:
+        gc.enable()
+
+
+def parse_args(argv):
+    """Opciones '--nombre valor' de la línea de órdenes (sin argparse)."""
+    options = {"scale": 1, "time": 0.2, "only": None, "save": None, "compare": None,
+               "tolerance": 0.1}
+    i = 1
+    while i < len(argv):
+        name = argv[i][2:] if argv[i][:2] == "--" else None
+        if name not in options or i + 1 >= len(argv):
+            raise SystemExit("opción no válida: " + argv[i])
+        value = argv[i + 1]
+        if name == "scale":
+            value = int(value)
+        elif name in ("time", "tolerance"):
+            value = float(value)
+        options[name] = value
+        i += 2
+    return options
+
+
+def run(options):
+    """Ejecuta la suite y devuelve {"corpus/api": {"ops": ..., "mem": ...}}."""
+    results = {}
+    for corpus_name in sorted(CORPORA):
+        generate, queries = CORPORA[corpus_name]
+        html = generate(options["scale"])
+        for api, fn in operations(html, queries).items():
+            key = corpus_name + "/" + api
+            if options["only"] and options["only"] not in key:
+                continue
+            results[key] = {"ops": ops_per_second(fn, options["time"]), "mem": memory(fn)}
+            gc.collect()
+    return results
+
+
+def report(results, baseline, tolerance):
+    """Imprime la tabla de resultados y devuelve las claves más lentas que la base."""
+    slower = []
+    print(f"{'caso':<22}{'ops/s':>12}{'memoria (KB)':>14}{'vs base':>10}")
+    for key in sorted(results):
+        current = results[key]
+        change = ""
+        if baseline and key in baseline:
+            ratio = current["ops"] / baseline[key]["ops"]
+            change = f"{(ratio - 1) * 100:+.0f}%"
+            if ratio < 1 - tolerance:
+                slower.append(key)
+                change += " !"
+        print(f"{key:<22}{current['ops']:>12.1f}{current['mem'] / 1024:>14.1f}{change:>10}")
+    return slower
+
+
+def main():
+    options = parse_args(sys.argv)
+    baseline = None
+    if options["compare"]:
+        with open(options["compare"]) as f:
+            baseline = json.load(f)["results"]
+
+    results = run(options)
+    slower = report(results, baseline, options["tolerance"])
+
+    if options["save"]:
+        with open(options["save"], "w") as f:
+            json.dump({"implementation": sys.implementation.name, "scale": options["scale"],
+                       "results": results}, f)
+    if slower:
+        print("más lento que la base: " + ", ".join(slower))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
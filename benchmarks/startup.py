@@ -0,0 +1,115 @@
+# startup.py - Tiempo y memoria de arranque de MicroBS4
+#
+# Mide lo que paga una placa al arrancar: importar microbs4 (en MicroPython,
+# compilar el .py o cargar el .mpy), la primera búsqueda, la primera consulta
+# con selector CSS y la primera carga de un módulo opcional (StreamParser). En
+# cada repetición se borran los módulos de sys.modules para volver a
+# importarlos; en CPython la compilación queda en caché en __pycache__, así que
+# la cifra útil es la del puerto unix de MicroPython:
+#
+#   micropython benchmarks/startup.py                      # desde los .py
+#   python tools/build_mpy.py && micropython benchmarks/startup.py --path build
+#
+# La memoria es la que queda ocupada tras cada paso en la primera repetición:
+# gc.mem_alloc en MicroPython, tracemalloc en CPython.
+
+import gc
+import sys
+
+_HERE = __file__.rsplit("/", 1)[0] if "/" in __file__ else "."
+sys.path.insert(0, _HERE)
+
+try:
+    from time import ticks_diff, ticks_us
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(end, start):
+        return end - start
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from corpus import listing
+
+STEPS = ("import", "find", "select", "stream")
+
+
+def _allocated():
+    gc.collect()
+    if tracemalloc is not None:
+        return tracemalloc.get_traced_memory()[0]
+    return gc.mem_alloc()
+
+
+def _unload():
+    """Olvida los módulos de MicroBS4 para que el siguiente import los cargue de nuevo."""
+    for name in list(sys.modules):
+        if name == "microbs4" or name.startswith("microbs4_"):
+            del sys.modules[name]
+
+
+def startup(html):
+    """Microsegundos y bytes retenidos de cada paso del arranque, en una ejecución."""
+    _unload()
+    times = {}
+    memory = {}
+    before = _allocated()
+
+    t0 = ticks_us()
+    microbs4 = __import__("microbs4")
+    times["import"] = ticks_diff(ticks_us(), t0)
+    memory["import"] = _allocated() - before
+
+    soup = microbs4.MicroBS4(html)
+    t0 = ticks_us()
+    soup.find("div", class_name="product")
+    times["find"] = ticks_diff(ticks_us(), t0)
+    memory["find"] = _allocated() - before
+
+    t0 = ticks_us()
+    soup.select_one("div.product span.price")
+    times["select"] = ticks_diff(ticks_us(), t0)
+    memory["select"] = _allocated() - before
+
+    t0 = ticks_us()
+    for _ in microbs4.MicroBS4.iter_matches(html, "h2"):
+        break
+    times["stream"] = ticks_diff(ticks_us(), t0)
+    memory["stream"] = _allocated() - before
+    return times, memory
+
+
+def main(argv):
+    repeat = 5
+    i = 1
+    while i < len(argv):
+        if argv[i] == "--path" and i + 1 < len(argv):
+            sys.path.insert(0, argv[i + 1])
+        elif argv[i] == "--repeat" and i + 1 < len(argv):
+            repeat = int(argv[i + 1])
+        else:
+            raise SystemExit("uso: startup.py [--path DIR] [--repeat N]")
+        i += 2
+    sys.path.append(_HERE + "/..")
+    html = listing(1)
+    if tracemalloc is not None:
+        tracemalloc.start()
+
+    runs = [startup(html) for _ in range(repeat)]
+    print("%-8s%12s%12s%16s" % ("paso", "mínimo us", "mediana us", "memoria (KB)"))
+    for step in STEPS:
+        times = sorted(run[0][step] for run in runs)
+        print("%-8s%12d%12d%16.1f" % (step, times[0], times[len(times) // 2],
+                                      runs[0][1][step] / 1024))
+    module = sys.modules["microbs4"]
+    print("módulo: " + getattr(module, "__file__", "(congelado)"))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,17 @@
+# manifest.py - Receta para congelar MicroBS4 en el firmware de MicroPython
+#
+# Los módulos congelados se ejecutan desde la flash: importarlos no compila
+# nada ni copia el bytecode al heap. Desde el árbol de MicroPython:
+#
+#   make -C ports/esp32 BOARD=ESP32_GENERIC \
+#       FROZEN_MANIFEST=/ruta/a/micropython-microbs4/manifest.py
+#
+# La primera línea conserva los módulos que el puerto congela por defecto.
+
+include("$(PORT_DIR)/boards/manifest.py")
+
+module("microbs4.py", opt=3)
+module("microbs4_stream.py", opt=3)
+module("microbs4_stats.py", opt=3)
+module("microbs4_pool.py", opt=3)
+module("microbs4_cache.py", opt=3)
@@ -1,87 +1,464 @@
 # microbs4.py - Versión para MicroPython
 # Parser HTML optimizado para MicroPython, con manejo correcto de múltiples clases y
 # una API pública consistente (find y select_one retornan un Element, no una tupla).
+# Este módulo es el núcleo (búsqueda, índice, selectores y Element); el análisis
+# por fragmentos, el procesamiento en paralelo, las estadísticas y la caché en
+# disco están en microbs4_stream, microbs4_pool, microbs4_stats y microbs4_cache
+# y se cargan al usarlos.
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ucollections import OrderedDict
+
+try:
+    from array import array
+except ImportError:
+    try:
+        from uarray import array
+    except ImportError:
+        array = None
+
 
 class MicroBS4:
-    def __init__(self, html):
-        self.html = html
-        self.length = len(html)
-        # Caché que usa (tag, str(attrs), start) para almacenar resultados
-        self._cache = {}
+    def __init__(self, html, indexed=False, cache_size=128, cache_bytes=None,
+                 cache_results=True, encoding="utf-8", stats=None, disk_cache=None):
+        # El documento puede ser str o un búfer de bytes (bytes, bytearray o
+        # memoryview) sin decodificar: en ese caso se busca el marcado ASCII
+        # directamente sobre los bytes y solo se decodifican con 'encoding' las
+        # porciones que se devuelven (atributos, texto, content/raw_html)
+        self.html = _buffer(html)
+        self.length = len(self.html)
+        self.encoding = encoding
+        # Caché LRU acotada por entradas (cache_size) y, opcionalmente, por bytes del
+        # documento cubiertos por los resultados (cache_bytes). Con cache_results
+        # find_all/select guardan la lista completa en una sola entrada.
+        self._cache = _LRUCache(cache_size, cache_bytes)
+        self.cache_results = cache_results
+        # En modo indexado el documento se tokeniza una sola vez (en la primera
+        # consulta) y las búsquedas recorren la lista de posiciones por etiqueta
+        self.indexed = indexed
+        self._index = None
+        # Pares apertura/cierre por etiqueta, resueltos a medida que se piden (ver _Pairs)
+        self._pairs = {}
+        # Zonas sin etiquetas reales (comentarios, CDATA y contenido de
+        # <script>/<style>), calculadas en el primer uso (ver _get_regions)
+        self._regions = None
+        # Datos de búsqueda de la apertura y el cierre de cada etiqueta y
+        # última búsqueda de cada una, compartidos con las vistas (ver _find_tag)
+        self._names = {}
+        # Recorrido de ancestros de parent/next_sibling sin índice (ver _ancestor_tree)
+        self._ancestry = None
+        # Rango [_lo, _hi) del documento al que se limitan las búsquedas. Las
+        # vistas creadas por _view comparten documento, índice y cachés con _root
+        self._root = self
+        self._lo = 0
+        self._hi = self.length
+        # Archivo abierto por from_file (se cierra con close)
+        self._file = None
+        # Caché persistente opcional (DiskCache, o la ruta de su directorio) detrás
+        # de la caché de resultados: microbs4_cache solo se importa si se indica
+        self.disk_cache = None
+        if disk_cache is not None:
+            from microbs4_cache import _attach
+            _attach(self, disk_cache)
+        # Estadísticas opcionales (ParseStats, o True para crear uno). Sin ellas
+        # no se comprueba nada en las búsquedas ni se importa microbs4_stats:
+        # _instrument sustituye en la instancia los métodos medidos por
+        # versiones que cuentan y cronometran
+        self.stats = None
+        if stats:
+            from microbs4_stats import ParseStats, _instrument
+            _instrument(self, ParseStats() if stats is True else stats)
+
+    @classmethod
+    def from_file(cls, path, encoding="utf-8", **kwargs):
+        """
+        Analiza un archivo HTML sin leerlo entero en memoria: en CPython el
+        archivo se proyecta con mmap y las búsquedas recorren la proyección, de
+        modo que el sistema operativo carga solo las páginas que se consultan y
+        los elementos extraen sus porciones al pedirlas. Donde no hay mmap
+        (MicroPython) se lee el archivo como bytes.
+        Los elementos dejan de ser válidos al cerrar el documento (close o with).
+        """
+        f = open(path, "rb")
+        html = b""
+        try:
+            try:
+                import mmap
+                html = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ImportError:
+                html = f.read()
+            except ValueError:
+                # Archivo vacío: no se puede proyectar
+                pass
+            soup = cls(html, encoding=encoding, **kwargs)
+        except BaseException:
+            # Sin documento no hay quien cierre la proyección ni el archivo
+            if not isinstance(html, bytes):
+                html.close()
+            f.close()
+            raise
+        soup._file = f
+        return soup
+
+    def close(self):
+        """Libera la proyección y el archivo abiertos por from_file."""
+        root = self._root
+        if root._file is None:
+            return
+        if not isinstance(root.html, (str, bytes, bytearray)):
+            root.html.close()
+        root._file.close()
+        root._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _view(self, lo, hi):
+        """
+        Devuelve un MicroBS4 que comparte documento, índice y cachés con el
+        documento raíz pero limita las búsquedas al rango [lo, hi). Se usa para
+        las búsquedas anidadas de Element sin copiar el contenido.
+        """
+        view = object.__new__(MicroBS4)
+        view.html = self.html
+        view.length = self.length
+        view.encoding = self.encoding
+        view._cache = self._cache
+        view.cache_results = self.cache_results
+        view.indexed = self.indexed
+        view._index = None
+        view._pairs = self._pairs
+        view._names = self._names
+        view._root = self._root
+        view._lo = lo
+        view._hi = hi
+        view.stats = None
+        return view
 
     def _find(self, tag, attrs=None, class_name=None, id=None, start=0):
         """
         Búsqueda interna que devuelve una tupla (elemento, posición siguiente).
+        'start' es una posición absoluta en el documento raíz.
         """
+        tag = tag.lower()
         attrs = self._consolidate_attrs(attrs, class_name, id)
-        cache_key = (tag, str(attrs), start)
-        if cache_key in self._cache:
-            return self._cache[cache_key]
+        start = max(start, self._lo)
+        # La marca "find" distingue la clave de las de find_all ("all") y select
+        # aunque la etiqueta buscada se llame así
+        cache_key = ("find", tag, _attrs_key(attrs), start, self._hi)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-        tag_open = f"<{tag}"
-        tag_close = f"</{tag}>"
+        result = self._search(tag, attrs, start)
+        if result[0] is not None:
+            self._cache.put(cache_key, result, _span_bytes(result[:1]))
+        return result
+
+    def _search(self, tag, attrs, start):
+        """Busca sin pasar por la caché, con el índice o recorriendo el texto."""
+        if self.indexed:
+            return self._find_indexed(tag, attrs, start)
+        return self._find_scan(tag, attrs, start)
+
+    def _find_scan(self, tag, attrs, start):
+        """
+        Busca la etiqueta recorriendo el texto con str.find desde 'start'. El
+        nombre se compara sin distinguir mayúsculas de minúsculas (ver _find_name).
+        """
+        html = self.html
+        gt = _literal(html, ">")
+        hi = self._hi
         pos = start
 
-        while pos < self.length:
-            start_pos = self.html.find(tag_open, pos)
+        while pos < hi:
+            start_pos = self._find_tag(tag, False, pos, hi)
             if start_pos == -1:
-                return None, self.length
+                return None, hi
 
-            next_char_pos = start_pos + len(tag_open)
-            if next_char_pos >= self.length:
-                return None, self.length
+            gt_pos = html.find(gt, start_pos, hi)
+            if gt_pos == -1:
+                return None, hi
 
-            next_char = self.html[next_char_pos]
-            # Verifica que se trate de la etiqueta buscada (para evitar coincidencias parciales)
-            if next_char in [' ', '>', '\t', '\n', '/']:
-                gt_pos = self.html.find(">", start_pos)
-                if gt_pos == -1:
-                    return None, self.length
-
-                is_self_closing = (self.html[gt_pos - 1] == "/")
-
-                if is_self_closing:
-                    tag_attrs = self.html[start_pos + len(tag_open):gt_pos - 1].strip()
-                    content_start = gt_pos + 1
-                    content_end = gt_pos  # No hay contenido en etiquetas auto-cerradas
-                else:
-                    tag_attrs = self.html[start_pos + len(tag_open):gt_pos].strip()
-                    content_start = gt_pos + 1
-                    content_end = self._find_matching_end_tag(tag, content_start)
-                    if content_end == -1:
-                        content_end = self.length
-
-                parsed_attrs = self._parse_attrs(tag_attrs)
-                if attrs and not self._attrs_match(parsed_attrs, attrs):
-                    pos = gt_pos + 1
-                    continue
+            # El cierre se busca solo si los atributos coinciden (ver _build_element)
+            result = self._build_match(tag, attrs, start_pos, gt_pos, None)
+            if result is not None:
+                return result
+            pos = gt_pos + 1
+
+        return None, hi
 
-                if is_self_closing:
-                    element = Element(
-                        tag=tag,
-                        attrs=parsed_attrs,
-                        content="",
-                        raw_html=self.html[start_pos:gt_pos + 1],
-                        self_closing=True
-                    )
-                    end_pos = gt_pos + 1
-                else:
-                    element = Element(
-                        tag=tag,
-                        attrs=parsed_attrs,
-                        content=self.html[content_start:content_end],
-                        raw_html=self.html[start_pos:content_end + len(tag_close)],
-                        self_closing=False
-                    )
-                    end_pos = content_end + len(tag_close)
-
-                result = (element, end_pos)
-                self._cache[cache_key] = result
+    def _find_indexed(self, tag, attrs, start):
+        """
+        Busca la etiqueta recorriendo la lista de posiciones del índice en lugar del texto.
+        """
+        hi = self._hi
+        index = self._get_index()
+        nodes = index.by_name.get(tag)
+        if not nodes:
+            return None, hi
+
+        starts = index.starts
+        gts = index.gts
+        ends = index.ends
+        pos = start
+        k = _lower_bound(nodes, starts, start)
+        while k < len(nodes):
+            node = nodes[k]
+            k += 1
+            start_pos = starts[node]
+            if start_pos < pos:
+                continue
+            gt_pos = gts[node]
+            if gt_pos >= hi:
+                break
+            result = self._build_match(tag, attrs, start_pos, gt_pos, ends[node])
+            if result is not None:
                 return result
+            pos = gt_pos + 1
+
+        return None, hi
+
+    def _build_match(self, tag, attrs, start_pos, gt_pos, content_end):
+        """
+        Construye el par (elemento, posición siguiente) para la etiqueta que empieza
+        en 'start_pos', o devuelve None si sus atributos no coinciden con 'attrs'.
+        """
+        # Con filtro solo se analizan los atributos buscados; el diccionario
+        # completo del elemento se construye al consultarlo (Element.attrs)
+        if attrs and not self._attrs_match(self._tag_attrs(tag, start_pos, gt_pos, attrs), attrs):
+            return None
+        return self._build_element(tag, start_pos, gt_pos, content_end)
+
+    def _build_element(self, tag, start_pos, gt_pos, content_end):
+        """
+        Construye el par (elemento, posición siguiente) para la etiqueta que empieza
+        en 'start_pos', sin comprobar atributos. Un 'content_end' igual a -1 indica
+        que la etiqueta no tiene cierre y None, que aún no se ha buscado. El
+        elemento guarda solo posiciones dentro del documento raíz. Los elementos
+        vacíos (<img>, <br>...) terminan en su '>' como los que llevan "/>",
+        aunque aparezca después un </img>.
+        """
+        if self.html[gt_pos - 1] in _SLASH or not _is_container(tag):
+            end_pos = gt_pos + 1
+            span = (start_pos, end_pos, end_pos, end_pos)
+            element = Element(tag, None, self_closing=True, doc=self._root, span=span)
+            return element, end_pos
+
+        if content_end is None:
+            content_end = self._find_matching_end_tag(tag, gt_pos + 1)
+        hi = self._hi
+        # Un cierre fuera del rango de búsqueda equivale a no tener cierre
+        if content_end == -1 or content_end > hi:
+            content_end = end_pos = hi
+        else:
+            end_pos = _close_end(self.html, content_end, self._size(tag))
+        span = (start_pos, gt_pos + 1, content_end, min(end_pos, hi))
+        element = Element(tag, None, doc=self._root, span=span)
+        return element, end_pos
+
+    def _get_regions(self):
+        """Devuelve el mapa de zonas sin etiquetas del documento raíz (ver _Regions)."""
+        root = self._root
+        if root._regions is None:
+            root._regions = _Regions(root.html)
+        return root._regions
+
+    def _find_tag(self, tag, closing, pos, end):
+        """
+        Posición de la siguiente etiqueta de apertura ("<tag") o, con 'closing',
+        de cierre ("</tag") en [pos, end) como _find_name, pero saltando las
+        zonas sin etiquetas.
+        """
+        memos = self._names.get(tag)
+        if memos is None:
+            if not tag:
+                # Ninguna etiqueta tiene el nombre vacío ("</" no es "<" + "")
+                return -1
+            html = self.html
+            memos = self._names[tag] = [_name_memo(html, "<", tag), _name_memo(html, "</", tag),
+                                        None, None]
+        memo = memos[closing]
+        # Última búsqueda (desde, hasta, resultado): el emparejado de cierres
+        # mira la apertura siguiente antes que find_all, que la pide después
+        last = memos[closing + 2]
+        if last is not None and last[0] <= pos:
+            found = last[2]
+            if found == -1:
+                if end <= last[1]:
+                    return -1
+            elif pos <= found:
+                return found if found + memo[4] < end else -1
+        html = self.html
+        found = _find_name(html, memo, pos, end)
+        if found != -1:
+            regions = self._root._regions
+            if regions is None:
+                regions = self._get_regions()
+            skip = regions.end_at(found)
+            while skip != -1:
+                found = _find_name(html, memo, skip, end)
+                if found == -1:
+                    break
+                skip = regions.end_at(found)
+        memos[closing + 2] = (pos, end, found)
+        return found
+
+    def _get_index(self):
+        """Devuelve el índice de etiquetas del documento raíz, construyéndolo en el primer uso."""
+        root = self._root
+        if root._index is None:
+            root._index = root._build_index()
+        return root._index
+
+    def _build_index(self):
+        """
+        Tokeniza el documento en una sola pasada lineal. Por cada etiqueta de
+        apertura registra la posición de '<', la de '>', la de su etiqueta de
+        cierre, su nombre y su elemento padre, y agrupa los nodos por nombre.
+        Los nombres se guardan en minúsculas: cada grafía distinta del documento
+        (<LI>, <Li>, </li >) se decodifica y se pasa a minúsculas una sola vez y
+        apunta al mismo identificador.
+        Los cierres se resuelven con una pila por nombre, igual que
+        _find_matching_end_tag; el padre es el elemento contenedor abierto
+        más reciente (los elementos vacíos como <br> no contienen a nadie).
+        """
+        html = self.html
+        encoding = None if isinstance(html, str) else self.encoding
+        index = _TagIndex()
+        starts = index.starts
+        gts = index.gts
+        ends = index.ends
+        name_ids = index.name_ids
+        tag_names = index.tag_names
+        parents = index.parents
+        by_name = index.by_name
+        ids = {}      # nombre tal como aparece en el documento -> entrada
+        entries = {}  # nombre en minúsculas -> entrada
+        containers = []
+        in_containers = set()
+
+        # Las porciones de un bytearray no sirven de clave: se copian a bytes
+        frozen = isinstance(html, bytearray)
+
+        for pos, name_end, gt_pos, closing in _tokenize(html, 0, self.length):
+            name = html[pos + (2 if closing else 1):name_end]
+            if frozen:
+                name = bytes(name)
+            entry = ids.get(name)
+            if entry is None:
+                # Grafía nueva: solo aquí se decodifica y se pasa a minúsculas
+                lowered = (name.decode(encoding) if encoding else name).lower()
+                entry = entries.get(lowered)
+                if entry is None:
+                    if closing:
+                        # Cierre de una etiqueta que aún no se ha abierto
+                        continue
+                    name_id = len(tag_names)
+                    if name_id == 0x10000:
+                        # Más nombres distintos de los que caben en 16 bits
+                        name_ids = index.name_ids = _column("i", name_ids)
+                    tag_names.append(lowered)
+                    nodes = by_name[lowered] = _column("i")
+                    entry = entries[lowered] = (name_id, nodes, [], _is_container(lowered))
+                ids[name] = entry
+            name_id, nodes, stack, container = entry
+
+            if closing:
+                # Un cierre dentro del propio texto de la etiqueta abierta no cuenta
+                if stack and gts[stack[-1]] < pos:
+                    node = stack.pop()
+                    ends[node] = pos
+                    if node in in_containers:
+                        # Cierra también los elementos abiertos dentro sin cierre propio
+                        while True:
+                            top = containers.pop()
+                            in_containers.discard(top)
+                            if top == node:
+                                break
+                continue
+
+            node = len(starts)
+            nodes.append(node)
+            starts.append(pos)
+            gts.append(gt_pos)
+            name_ids.append(name_id)
+            parents.append(containers[-1] if containers else -1)
+            if html[gt_pos - 1] in _SLASH:
+                ends.append(gt_pos)
             else:
-                pos = start_pos + 1
+                ends.append(-1)
+                stack.append(node)
+                if container:
+                    containers.append(node)
+                    in_containers.add(node)
+
+        return index
+
+    def _node_element(self, node):
+        """Construye el Element del nodo 'node' del índice, limitado al rango de búsqueda."""
+        index = self._get_index()
+        name = index.name(node)
+        element, _ = self._build_element(name, index.starts[node], index.gts[node],
+                                         index.ends[node])
+        return element
+
+    def _tree(self):
+        """Árbol para evaluar selectores: el índice en modo indexado y, si no, el texto (ver _ScanTree)."""
+        if self.indexed:
+            return _IndexTree(self)
+        return _ScanTree(self)
+
+    def _ancestor_tree(self):
+        """
+        _ScanTree del documento raíz para Element.parent y next_sibling sin
+        índice. Se conserva entre llamadas para que las consultas en orden de
+        documento continúen el mismo recorrido en lugar de empezar de nuevo.
+        """
+        root = self._root
+        if root._ancestry is None:
+            root._ancestry = _ScanTree(root)
+        return root._ancestry
+
+    def _node_at(self, pos):
+        """Nodo del índice cuya etiqueta de apertura empieza en 'pos'."""
+        starts = self._get_index().starts
+        node = _lower_bound(range(len(starts)), starts, pos)
+        if node < len(starts) and starts[node] == pos:
+            return node
+        raise ValueError("no hay ninguna etiqueta en la posición %d" % pos)
 
-        return None, self.length
+    def _node_attrs(self, node):
+        """Atributos del nodo 'node' del índice."""
+        index = self._get_index()
+        return self._tag_attrs(index.name(node), index.starts[node], index.gts[node])
+
+    def _tag_attrs(self, tag, start_pos, gt_pos, names=None):
+        """
+        Atributos de la etiqueta de apertura html[start_pos:gt_pos + 1] (sin la
+        barra de auto-cierre). Con 'names' solo se devuelven esos atributos.
+        """
+        if self.html[gt_pos - 1] in _SLASH:
+            gt_pos -= 1
+        return self._parse_attrs(self._text(start_pos + self._size(tag) + 1, gt_pos).strip(), names)
+
+    def _size(self, name):
+        """Longitud de 'name' en el documento: en bytes con 'encoding' si es un búfer."""
+        if isinstance(self.html, str):
+            return len(name)
+        return len(name.encode(self.encoding))
+
+    def _text(self, start, end):
+        """Porción html[start:end] del documento como str (decodificada si es un búfer de bytes)."""
+        text = self.html[start:end]
+        if isinstance(text, str):
+            return text
+        return text.decode(self.encoding)
 
     def find(self, tag, attrs=None, class_name=None, id=None):
         """
@@ -93,171 +470,358 @@ class MicroBS4:
         element, _ = result
         return element
 
-    def find_all(self, tag, attrs=None, class_name=None, id=None, limit=None):
+    def find_all(self, tag, attrs=None, class_name=None, id=None, limit=None,
+                 workers=None):
         """
         Encuentra todas las ocurrencias de la etiqueta especificada.
+        Con 'workers' (número de procesos o un Executor) el documento se divide
+        en los límites entre elementos 'tag' de primer nivel y los trozos se
+        buscan en paralelo (ver _parallel_search); sin límites, o con 'limit',
+        la búsqueda es en serie. El resultado es el mismo en ambos casos.
         """
+        tag = tag.lower()
         attrs = self._consolidate_attrs(attrs, class_name, id)
-        results = []
-        pos = 0
-        safety_counter = 0
-        max_iterations = 1000
-
-        while pos < self.length and (limit is None or len(results) < limit) and safety_counter < max_iterations:
-            safety_counter += 1
-            found = self._find(tag, attrs, start=pos)
-            if not found:
-                break
-            element, next_pos = found
-            if element is None:
-                break
-            results.append(element)
-            pos = next_pos
+        cache_key = None
+        if self.cache_results:
+            cache_key = ("all", tag, _attrs_key(attrs), limit, self._lo, self._hi)
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return list(cached)
 
+        results = None
+        if workers is not None and limit is None:
+            results = self._parallel_search(("all", tag, attrs), self._tag_bounds(tag), workers)
+        if results is None:
+            results = _take(self._iter_all(tag, attrs), limit)
+        if cache_key is not None:
+            self._cache.put(cache_key, tuple(results), _span_bytes(results))
         return results
 
+    def iter_all(self, tag, attrs=None, class_name=None, id=None):
+        """
+        Genera las ocurrencias de la etiqueta de una en una, con la misma semántica
+        que find_all, sin construir la lista de resultados. Cada búsqueda continúa
+        desde el final de la anterior, así que cortar el recorrido solo cuesta el
+        trabajo ya consumido.
+        """
+        return self._iter_all(tag.lower(), self._consolidate_attrs(attrs, class_name, id))
+
+    def _iter_all(self, tag, attrs):
+        pos = self._lo
+        while pos < self._hi:
+            element, next_pos = self._search(tag, attrs, pos)
+            if element is None:
+                return
+            yield element
+            # Avance garantizado: el final de un elemento nunca queda antes de su inicio
+            pos = max(next_pos, pos + 1)
+
     def select_one(self, selector):
         """
-        Selecciona el primer elemento que coincide con un selector CSS simplificado.
+        Selecciona el primer elemento que coincide con el selector CSS.
         """
-        tag, attrs = self._parse_selector(selector)
-        result = self._find(tag, attrs, start=0)
-        if result is None:
-            return None
-        element, _ = result
-        return element
+        results = self.select(selector, limit=1)
+        return results[0] if results else None
+
+    def select(self, selector, limit=None, workers=None):
+        """
+        Selecciona todos los elementos que coinciden con el selector CSS, en orden
+        de documento. 'selector' puede ser un texto o un Selector ya compilado
+        (ver compile_selector). Se evalúa en una sola pasada sobre el índice en
+        modo indexado o, si no, sobre los candidatos que encuentra str.find.
+        Con 'workers' los selectores sin combinadores se evalúan en paralelo como
+        en find_all; los que tienen combinadores dependen de los ancestros y se
+        evalúan en serie.
+        """
+        if isinstance(selector, str):
+            selector = compile_selector(selector)
+        cache_key = None
+        if self.cache_results:
+            cache_key = ("select", selector.text, limit, self._lo, self._hi)
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return list(cached)
+
+        results = None
+        if workers is not None and limit is None and selector._is_simple():
+            results = self._parallel_search(("select", selector.text, None),
+                                            self._node_bounds(selector._names), workers)
+        if results is None:
+            results = _take(selector.iter_select(self), limit)
+        if cache_key is not None:
+            self._cache.put(cache_key, tuple(results), _span_bytes(results))
+        return results
 
-    def select(self, selector):
+    def iter_select(self, selector):
         """
-        Selecciona todos los elementos que coinciden con el selector CSS simplificado.
+        Genera los elementos que coinciden con el selector CSS en orden de
+        documento, sin construir la lista de resultados (ver select).
         """
-        tag, attrs = self._parse_selector(selector)
-        return self.find_all(tag, attrs)
+        if isinstance(selector, str):
+            selector = compile_selector(selector)
+        return selector.iter_select(self)
 
-    def _parse_selector(self, selector):
+    def iter_text(self):
         """
-        Convierte un selector CSS simplificado en parámetros para búsqueda.
-        Soporta:
-          - Selector por etiqueta: div, span, etc.
-          - Selector por ID: #content
-          - Selector por clase: .item
-          - Selector mixto: tag.class o tag#id
+        Genera los fragmentos de texto del documento (o del rango de búsqueda) sin
+        etiquetas, comentarios ni código de <script>/<style>, con las entidades
+        habituales decodificadas y sin construir la cadena completa.
         """
-        if not selector:
-            return '*', None
+        return _iter_text(self.html, self._lo, self._hi, self.encoding)
 
-        tag = '*'
-        attrs = {}
+    def extract(self, fields):
+        """
+        Extrae varios campos en una sola pasada sobre el documento. 'fields' asocia
+        cada nombre con un selector: si es un texto (o un Selector) el valor es el
+        primer elemento que coincide o None; si va dentro de una lista, como
+        ["a[href]"], el valor es la lista de todos los elementos que coinciden
+        (varios selectores en la lista forman un grupo: ["h1", "h2"] equivale
+        a ["h1, h2"]).
+        Cada etiqueta se compara solo con los selectores cuyo último compuesto
+        admite su nombre.
+        """
+        results = {}
+        by_name = {}
+        universal = []
+        singles = 0
+        for field, selector in fields.items():
+            many = isinstance(selector, (list, tuple))
+            if many:
+                selector = _group_text(selector)
+            if isinstance(selector, str):
+                selector = compile_selector(selector)
+            results[field] = [] if many else None
+            if not many:
+                singles += 1
+            entry = (field, selector, many)
+            if selector._names is None:
+                universal.append(entry)
+            else:
+                for name in selector._names:
+                    if name not in by_name:
+                        by_name[name] = []
+                    by_name[name].append(entry)
 
-        if selector.startswith('#'):
-            id_value = selector[1:]
-            return tag, {'id': id_value}
-        if selector.startswith('.'):
-            class_value = selector[1:]
-            return tag, {'class': class_value}
-
-        if '#' in selector:
-            parts = selector.split('#', 1)
-            tag = parts[0] or '*'
-            attrs['id'] = parts[1]
-        elif '.' in selector:
-            parts = selector.split('.', 1)
-            tag = parts[0] or '*'
-            attrs['class'] = parts[1]
+        if not results:
+            return results
+        all_single = singles == len(results)
+        tree = self._tree()
+        for node in tree.nodes(None if universal else list(by_name)):
+            candidates = by_name.get(tree.name(node))
+            element = None
+            for entries in (candidates, universal):
+                if not entries:
+                    continue
+                for field, selector, many in entries:
+                    if not many and results[field] is not None:
+                        continue
+                    if not selector._matches(tree, node):
+                        continue
+                    if element is None:
+                        element = tree.element(node)
+                    if many:
+                        results[field].append(element)
+                    else:
+                        results[field] = element
+                        singles -= 1
+            if all_single and singles == 0:
+                break
+        return results
+
+    @staticmethod
+    def iter_matches(readable, selector, chunk_size=1024, encoding="utf-8"):
+        """
+        Recorre un documento por fragmentos y genera los elementos que coinciden
+        con 'selector' (o con cualquiera de una lista de selectores) en cuanto se
+        cierran, sin cargar la página completa en memoria.
+        'readable' puede ser un str/bytes, un objeto con read() (archivo, socket)
+        o un iterable de fragmentos.
+        """
+        from microbs4_stream import StreamParser, _iter_chunks
+        parser = StreamParser(selector, encoding)
+        for chunk in _iter_chunks(readable, chunk_size):
+            for element in parser.feed(chunk):
+                yield element
+        for element in parser.close():
+            yield element
+
+    def cache_info(self):
+        """Estadísticas de la caché de resultados (compartida con las búsquedas anidadas)."""
+        cache = self._cache
+        return {
+            "hits": cache.hits,
+            "misses": cache.misses,
+            "evictions": cache.evictions,
+            "entries": len(cache),
+            "bytes": cache.bytes,
+        }
+
+    def _tag_bounds(self, tag):
+        """
+        Posiciones dentro del rango de búsqueda donde se puede cortar find_all(tag)
+        sin cambiar el resultado: en ellas no queda abierto ningún elemento 'tag'
+        (en modo indexado, según los cierres del índice; si no, según _pair_table).
+        """
+        if self.indexed:
+            return self._node_bounds([tag])
+        top_level = self._pair_table(tag).top_level
+        lo = self._lo
+        hi = self._hi
+        return [pos for pos in top_level if lo < pos < hi]
+
+    def _node_bounds(self, names):
+        """
+        Inicios de nodos del índice con nombre en 'names' (todos si es None) antes
+        de los cuales ya se han cerrado todos los anteriores del rango con esos
+        nombres. Un nodo sin cierre impide cortar después de él.
+        """
+        index = self._get_index()
+        starts = index.starts
+        ends = index.ends
+        if names is None:
+            nodes = range(len(starts))
         else:
-            tag = selector
+            nodes = []
+            for name in names:
+                nodes.extend(index.by_name.get(name, ()))
+            nodes.sort()
+        lo = self._lo
+        hi = self._hi
+        bounds = []
+        reach = lo
+        k = _lower_bound(nodes, starts, lo)
+        while k < len(nodes):
+            node = nodes[k]
+            k += 1
+            start_pos = starts[node]
+            if start_pos >= hi:
+                break
+            if start_pos > reach and start_pos > lo:
+                bounds.append(start_pos)
+            end = ends[node]
+            if end == -1:
+                break
+            if end > reach:
+                reach = end
+        return bounds
 
-        return tag, attrs if attrs else None
+    def _parallel_search(self, query, bounds, workers):
+        """
+        Reparte el rango de búsqueda en trozos de tamaño parecido cortando solo en
+        'bounds', busca 'query' en cada trozo en un Executor (ver _pool_map) y
+        reconstruye los Element sobre este documento en orden. Devuelve None si
+        no hay dónde cortar.
+        """
+        if not bounds:
+            return None
+        from microbs4_pool import _pool_map, _search_chunk
+        lo = self._lo
+        hi = self._hi
+        parts = (workers if isinstance(workers, int) else 4) * 4
+        size = (hi - lo) // parts + 1
+        cuts = [lo]
+        for pos in bounds:
+            if pos - cuts[-1] >= size:
+                cuts.append(pos)
+        if len(cuts) == 1:
+            return None
+        cuts.append(hi)
+        jobs = [(query, self.html[cuts[i]:cuts[i + 1]], cuts[i], self.indexed, self.encoding)
+                for i in range(len(cuts) - 1)]
+        root = self._root
+        results = []
+        for found in _pool_map(_search_chunk, jobs, workers):
+            for name, self_closing, span in found:
+                results.append(Element(name, None, self_closing=self_closing, doc=root, span=span))
+        return results
 
     def _find_matching_end_tag(self, tag, start_pos):
         """
         Encuentra la posición en el HTML donde se cierra la etiqueta 'tag',
-        considerando etiquetas anidadas.
+        considerando etiquetas anidadas. 'start_pos' es la posición siguiente
+        al '>' de la etiqueta de apertura.
+        Los pares se resuelven solo hasta el cierre pedido (ver _Pairs); un par
+        ya resuelto es una consulta O(1).
         """
-        tag_open = f"<{tag}"
-        tag_close = f"</{tag}>"
-        nesting_level = 1
-        pos = start_pos
-
-        while nesting_level > 0 and pos < self.length:
-            next_open = self.html.find(tag_open, pos)
-            next_close = self.html.find(tag_close, pos)
-
-            if next_close == -1:
+        pairs = self._pairs.get(tag)
+        if pairs is not None:
+            end = pairs.table.get(start_pos)
+            if end is not None:
+                return end
+            if pairs.done:
                 return -1
+        return self._pair_table(tag, start_pos).table.get(start_pos, -1)
 
-            if next_open == -1 or next_close < next_open:
-                nesting_level -= 1
-                pos = next_close + len(tag_close)
-            else:
-                tag_attr_pos = next_open + len(tag_open)
-                if (tag_attr_pos < self.length and
-                    self.html[tag_attr_pos] in [' ', '>', '\t', '\n', '/']):
-                    gt_pos = self.html.find(">", next_open)
-                    if gt_pos == -1:
-                        return -1
-                    if self.html[gt_pos - 1] != '/':
-                        nesting_level += 1
-                    pos = gt_pos + 1
-                else:
-                    pos = next_open + 1
-
-        if nesting_level == 0:
-            return pos - len(tag_close)
-        return -1
+    def _pair_table(self, tag, until=None):
+        """
+        Devuelve los pares apertura/cierre de 'tag' (ver _Pairs), compartidos con
+        las vistas, resueltos al menos hasta el cierre de la apertura cuyo
+        contenido empieza en 'until' o, sin 'until', en todo el documento.
+        """
+        pairs = self._pairs.get(tag)
+        if pairs is None:
+            pairs = self._pairs[tag] = _Pairs(self._root, tag)
+        pairs.resolve(self.length + 1 if until is None else until)
+        return pairs
 
-    def _parse_attrs(self, attrs_str):
+    def _parse_attrs(self, attrs_str, names=None):
         """
         Convierte una cadena de atributos HTML en un diccionario.
         Soporta comillas dobles, simples, sin comillas y atributos booleanos.
+        Los nombres y valores se extraen como porciones de la cadena (los valores
+        entre comillas con str.find), sin construirlos carácter a carácter.
+        Si se indica 'names' (iterable de nombres), solo se guardan esos atributos
+        y el resto se salta sin copiarlo.
         """
-        if not attrs_str:
-            return {}
         attrs = {}
+        if not attrs_str:
+            return attrs
+        length = len(attrs_str)
         i = 0
-        current_attr = ""
-        in_value = False
-        quote_char = None
-        value = ""
-
-        while i < len(attrs_str):
+        while i < length:
             char = attrs_str[i]
-            if in_value:
-                if char == quote_char:
-                    in_value = False
-                    attrs[current_attr.strip()] = value
-                    current_attr = ""
-                    value = ""
-                else:
-                    value += char
-            elif char == '=':
-                current_attr = current_attr.strip()
+            if char in ' \t\n\r\f' or char == '=':
                 i += 1
-                while i < len(attrs_str) and attrs_str[i].isspace():
-                    i += 1
-                if i < len(attrs_str) and attrs_str[i] in ['"', "'"]:
-                    quote_char = attrs_str[i]
-                    in_value = True
-                    i += 1
-                    continue
-                else:
-                    value_end = i
-                    while value_end < len(attrs_str) and not attrs_str[value_end].isspace():
-                        value_end += 1
-                    attrs[current_attr] = attrs_str[i:value_end]
-                    i = value_end
-                    current_attr = ""
-                    continue
-            elif char.isspace():
-                if current_attr:
-                    attrs[current_attr.strip()] = True
-                    current_attr = ""
-            else:
-                current_attr += char
-            i += 1
+                continue
 
-        if current_attr:
-            attrs[current_attr.strip()] = True
+            name_start = i
+            while i < length and attrs_str[i] not in ' \t\n\r\f=':
+                i += 1
+            name_end = i
+            wanted = names is None
+            if not wanted:
+                size = name_end - name_start
+                for name in names:
+                    if len(name) == size and attrs_str.startswith(name, name_start):
+                        wanted = True
+                        break
+
+            while i < length and attrs_str[i] in ' \t\n\r\f':
+                i += 1
+            if i >= length or attrs_str[i] != '=':
+                if wanted:
+                    attrs[attrs_str[name_start:name_end]] = True
+                continue
+
+            i += 1
+            while i < length and attrs_str[i] in ' \t\n\r\f':
+                i += 1
+            if i < length and attrs_str[i] in '"\'':
+                value_end = attrs_str.find(attrs_str[i], i + 1)
+                if value_end == -1:
+                    # Comillas sin cerrar: se conserva como atributo booleano
+                    if wanted:
+                        attrs[attrs_str[name_start:name_end]] = True
+                    break
+                value_start = i + 1
+                i = value_end + 1
+            else:
+                value_start = i
+                while i < length and attrs_str[i] not in ' \t\n\r\f':
+                    i += 1
+                value_end = i
+            if wanted:
+                attrs[attrs_str[name_start:name_end]] = attrs_str[value_start:value_end]
 
         return attrs
 
@@ -297,21 +861,702 @@ class MicroBS4:
         return result if result else None
 
 
+class _LRUCache:
+    """
+    Caché LRU acotada por número de entradas y, opcionalmente, por un presupuesto
+    de bytes. Cada entrada declara su tamaño al guardarse.
+    """
+    def __init__(self, max_entries=128, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """Devuelve el valor guardado (marcándolo como recién usado) o None."""
+        entry = self._data.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._data[key] = entry
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, size=0):
+        """Guarda un valor y expulsa las entradas menos usadas si se supera el límite."""
+        if self.max_entries <= 0:
+            return
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self._data[key] = (value, size)
+        self.bytes += size
+        while self._data and (len(self._data) > self.max_entries or
+                              (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            # La primera clave es la usada hace más tiempo
+            evicted = self._data.pop(next(iter(self._data)))
+            self.bytes -= evicted[1]
+            self.evictions += 1
+
+    def clear(self):
+        self._data = OrderedDict()
+        self.bytes = 0
+
+
+def _attrs_key(attrs):
+    """Clave canónica y hashable para un diccionario de atributos de búsqueda."""
+    if not attrs:
+        return None
+    return tuple(sorted(attrs.items()))
+
+
+def _take(iterable, limit=None):
+    """Lista con los primeros 'limit' elementos de 'iterable' (todos si es None)."""
+    results = []
+    if limit is not None and limit <= 0:
+        return results
+    for item in iterable:
+        results.append(item)
+        if limit is not None and len(results) >= limit:
+            break
+    return results
+
+
+def _span_bytes(elements):
+    """Bytes del documento que abarcan los elementos (tamaño declarado en la caché)."""
+    total = 0
+    for element in elements:
+        span = element._span
+        if span is not None:
+            total += span[3] - span[0]
+    return total
+
+
+class _TagIndex:
+    """
+    Tablas compactas con las posiciones de cada etiqueta de apertura del documento.
+    Los nodos se numeran en orden de aparición. Cada tabla es una columna de
+    enteros de 32 bits (array) en lugar de una lista de objetos, así que un nodo
+    ocupa unos 22 bytes y el recolector de basura no tiene que recorrerlas. Los
+    nombres se guardan una sola vez en 'tag_names' y cada nodo apunta a su
+    nombre con un identificador de 16 bits. Los atributos y el texto no se
+    guardan: se obtienen del documento a partir de las posiciones.
+    """
+    def __init__(self):
+        self.starts = _column("i")    # posición de '<'
+        self.gts = _column("i")       # posición del '>' que cierra la etiqueta de apertura
+        self.ends = _column("i")      # posición de '</tag>' (-1 si no se cierra, '>' si es auto-cerrada)
+        self.parents = _column("i")   # nodo contenedor (-1 en el nivel superior)
+        self.name_ids = _column("H")  # identificador del nombre en 'tag_names'
+        self.tag_names = []           # nombres de etiqueta distintos, en orden de aparición
+        self.by_name = {}             # nombre de etiqueta -> columna de nodos
+
+    def name(self, node):
+        """Nombre de la etiqueta del nodo 'node'."""
+        return self.tag_names[self.name_ids[node]]
+
+
+def _column(typecode, values=()):
+    """Columna de enteros: un array con ese tipo, o una lista si no hay módulo array."""
+    if array is None:
+        return list(values)
+    return array(typecode, values)
+
+
+class _Regions:
+    """
+    Zonas de un documento que no contienen etiquetas: comentarios, secciones
+    CDATA y el contenido de <script> y <style>. Se localizan buscando sus
+    aperturas y, para cada una, su delimitador de cierre con un solo find; lo
+    que hay dentro no se examina. Una zona sin cierre llega hasta el final del
+    documento. El mapa se amplía por bloques a medida que se consulta, así que
+    una búsqueda que termina pronto no recorre el documento entero; los bloques
+    empiezan pequeños y doblan su tamaño en cada ampliación.
+    """
+    def __init__(self, html):
+        self.html = html
+        self.length = len(html)
+        self.starts = []
+        self.ends = []
+        # Todas las zonas que empiezan antes de 'covered' ya están registradas
+        self.covered = 0
+        self._block = 256
+        # Hueco [free_lo, free_hi) sin zonas de la última consulta de end_at
+        self.free_lo = 0
+        self.free_hi = 0
+        # "<!" abre comentarios y CDATA (y también <!DOCTYPE>, que no es una zona);
+        # <script> y <style> se buscan sin distinguir mayúsculas (ver _find_name)
+        self._bang = _literal(html, "<!")
+        self._openers = [_name_memo(html, "<", name) for name in _RAW_TEXT_TAGS]
+        self._closers = [_name_memo(html, "</", name) for name in _RAW_TEXT_TAGS]
+        self._sections = ((_literal(html, "<!--"), _literal(html, "-->")),
+                          (_literal(html, "<![CDATA["), _literal(html, "]]>")))
+        self._gt = _literal(html, ">")
+
+    def end_at(self, pos):
+        """Fin de la zona que contiene 'pos', o -1 si 'pos' no está en ninguna."""
+        # Sin zonas entre las dos últimas consultadas no hace falta buscar
+        if self.free_lo <= pos < self.free_hi:
+            return -1
+        if pos >= self.covered:
+            self._extend(pos)
+        starts = self.starts
+        # Última zona que empieza en 'pos' o antes
+        k = _lower_bound(range(len(starts)), starts, pos + 1) - 1
+        if k >= 0 and self.ends[k] > pos:
+            return self.ends[k]
+        # Hueco entre esa zona y la siguiente (o lo ya registrado)
+        self.free_lo = self.ends[k] if k >= 0 else 0
+        self.free_hi = starts[k + 1] if k + 1 < len(starts) else self.covered
+        return -1
+
+    def _extend(self, pos):
+        """Registra las zonas que empiezan antes de pos + 1 (al menos un bloque más)."""
+        html = self.html
+        length = self.length
+        target = min(max(pos + 1, self.covered + self._block), length)
+        self._block = min(self._block * 2, 65536)
+        p = self.covered
+        while p < target:
+            # Apertura más próxima que empiece antes de 'target'
+            start = html.find(self._bang, p, target + 1)
+            which = -1 if start == -1 else 0
+            for i in range(len(_RAW_TEXT_TAGS)):
+                name = _RAW_TEXT_TAGS[i]
+                limit = target if start == -1 else start
+                found = _find_name(html, self._openers[i], p, min(limit + len(name) + 1, length))
+                if found != -1:
+                    start = found
+                    which = i + 1
+            if start == -1:
+                break
+            end = self._region(which, start)
+            if end == -1:
+                p = start + 1
+                continue
+            p = end
+        self.covered = max(target, p)
+
+    def _region(self, which, start):
+        """Registra la zona que abre la apertura 'which' en 'start'; devuelve su fin o -1 si no abre ninguna."""
+        html = self.html
+        length = self.length
+        if which == 0:
+            for opener, closer in self._sections:
+                if html[start:start + len(opener)] == opener:
+                    close = html.find(closer, start + len(opener))
+                    end = length if close == -1 else close + len(closer)
+                    break
+            else:
+                return -1
+        else:
+            # Solo la etiqueta <script>/<style> completa abre una zona; su
+            # contenido empieza tras el '>' y acaba en el '<' del cierre
+            name = _RAW_TEXT_TAGS[which - 1]
+            gt_pos = html.find(self._gt, start + len(name) + 1)
+            if gt_pos == -1 or html[gt_pos - 1] in _SLASH:
+                return -1
+            start = gt_pos + 1
+            close = _find_name(html, self._closers[which - 1], start, length)
+            end = length if close == -1 else close
+            if end == start:
+                return end
+        self.starts.append(start)
+        self.ends.append(end)
+        return end
+
+
+class _Pairs:
+    """
+    Pares apertura/cierre de una etiqueta, resueltos con una pila en un solo
+    barrido que avanza solo lo necesario: cada consulta sigue desde donde se
+    quedó la anterior hasta encontrar el cierre pedido, igual que _Regions amplía
+    su mapa por bloques. Si el barrido aún no ha llegado a la apertura pedida,
+    antes se prueba un recorrido corto desde ella misma (ver resolve). 'table'
+    es {inicio del contenido: posición de '</tag>'} (las etiquetas sin cierre
+    no aparecen) y 'top_level', las posiciones tras cada '</tag>' que vacía la
+    pila del barrido (límites entre elementos 'tag' de primer nivel). Aperturas
+    y cierres se emparejan sin distinguir mayúsculas (<LI>...</li>) y el cierre
+    admite espacios antes del '>' ("</li >").
+    """
+    def __init__(self, soup, tag):
+        self.table = {}
+        self.top_level = []
+        # Ya no quedan cierres: el resto de aperturas no tiene pareja
+        self.done = False
+        self._find = soup._find_tag
+        self._html = soup.html
+        self._length = soup.length
+        self._tag = tag
+        self._size = soup._size(tag) + 3  # len("</tag>")
+        self._gt = _literal(soup.html, ">")
+        # Estado del barrido (ver _sweep): pila de aperturas sin cierre, inicio
+        # del contenido de la última apertura procesada, siguiente apertura (-1
+        # si no hay ninguna que empiece antes de la posición siguiente), desde
+        # dónde buscarla, siguiente cierre (None si hay que buscarlo desde la
+        # posición siguiente) y desde dónde buscarlo
+        self._state = [[], 0, -1, 0, None, 0]
+
+    def resolve(self, until):
+        """
+        Avanza el barrido hasta saber si se cierra, y dónde, la apertura cuyo
+        contenido empieza en 'until' (hasta el final si 'until' no es ninguna).
+        """
+        if until in self.table or self.done:
+            return
+        if self._state[1] < until < self._length:
+            # Casi siempre el cierre está cerca de la apertura: se cuentan
+            # aperturas y cierres desde ella, y solo si hacen falta más de
+            # _WALK_LIMIT etiquetas se sigue el barrido desde donde iba. Los
+            # pares que resuelve son los mismos que daría el barrido
+            walk = [[until], until, -1, until, None, until]
+            if self._sweep(walk, until, _WALK_LIMIT, None) is not False:
+                return
+        if self._sweep(self._state, until, -1, self.top_level) is None:
+            # No quedan cierres: las aperturas pendientes no tienen pareja
+            self.done = True
+
+    def _sweep(self, state, until, budget, top_level):
+        """
+        Procesa aperturas y cierres desde 'state' hasta resolver 'until' o
+        procesar 'budget' etiquetas (-1: sin límite) y guarda el estado
+        alcanzado. Devuelve True si 'until' quedó resuelto, False si se agotó
+        'budget' y None si no quedan cierres. Con 'top_level' anota en él los
+        cierres que vacían la pila.
+        """
+        table = self.table
+        html = self._html
+        length = self._length
+        find = self._find
+        tag = self._tag
+        size = self._size
+        gt = self._gt
+        stack, opened, next_open, open_from, next_close, close_from = state
+        result = True
+        while True:
+            if until in table or (opened >= until and until not in stack):
+                break
+            if budget == 0:
+                result = False
+                break
+            budget -= 1
+            if next_close is None:
+                next_close = find(tag, True, close_from, length)
+                if next_close == -1:
+                    result = None
+                    break
+            if next_open == -1 and open_from < next_close:
+                # Basta con saber si hay una apertura antes del siguiente cierre;
+                # se mira un bloque más allá para no repetir la búsqueda tras él
+                stop = min(next_close + 4096, length)
+                next_open = find(tag, False, open_from, stop)
+                if next_open == -1:
+                    # Una apertura que acaba en 'stop' no se habría reconocido
+                    open_from = length if stop == length else max(stop - size, next_close)
+
+            if next_open != -1 and next_open < next_close:
+                gt_pos = html.find(gt, next_open)
+                if gt_pos == -1:
+                    result = None
+                    break
+                if html[gt_pos - 1] not in _SLASH:
+                    stack.append(gt_pos + 1)
+                # Lo que aparezca dentro del texto de la etiqueta no cuenta
+                opened = open_from = gt_pos + 1
+                next_open = -1
+                if next_close <= gt_pos:
+                    close_from = gt_pos + 1
+                    next_close = None
+            else:
+                # Posición tras el '>' del cierre; casi siempre "</tag>" justo
+                close_end = next_close + size
+                if close_end > length or html[close_end - 1] not in _GT:
+                    close_end = html.find(gt, next_close) + 1
+                    if close_end == 0:
+                        result = None
+                        break
+                if stack:
+                    table[stack.pop()] = next_close
+                    if not stack and top_level is not None:
+                        top_level.append(close_end)
+                close_from = close_end
+                next_close = None
+        state[1:] = [opened, next_open, open_from, next_close, close_from]
+        return result
+
+
+# Etiquetas que _Pairs procesa desde una apertura antes de seguir el barrido
+_WALK_LIMIT = 64
+
+
+def _lower_bound(nodes, starts, pos):
+    """Primer índice k de 'nodes' tal que starts[nodes[k]] >= pos (búsqueda binaria)."""
+    lo = 0
+    hi = len(nodes)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if starts[nodes[mid]] < pos:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+
+# Elementos HTML vacíos: nunca contienen a otros aunque no lleven "/>"
+_VOID_TAGS = ("area", "base", "br", "col", "embed", "hr", "img", "input",
+              "link", "meta", "param", "source", "track", "wbr")
+
+
+def _is_container(name):
+    """Indica si una etiqueta abierta (sin "/>") puede contener a las siguientes."""
+    return name[0] not in "!?" and name not in _VOID_TAGS
+
+
+# Delimitadores del nombre de etiqueta y barra de auto-cierre, como carácter
+# (documentos str) y como código (documentos bytes, donde html[i] es un entero)
+_NAME_END = {" ", ">", "\t", "\n", "/", 32, 62, 9, 10, 47}
+_SLASH = ("/", 47)
+_BANG = ("!", 33)
+_GT = (">", 62)
+
+
+def _literal(html, text):
+    """Devuelve 'text' (ASCII) del mismo tipo que el documento 'html': str o bytes."""
+    if isinstance(html, str):
+        return text
+    return text.encode()
+
+
+def _find_name(html, memo, pos, end):
+    """
+    Posición de la primera etiqueta prefix + name ("<li", "</li") de 'memo' (ver
+    _name_memo) en html[pos:end], seguida de un delimitador de nombre también
+    antes de 'end', o -1. El nombre se compara entero y sin distinguir
+    mayúsculas de minúsculas, sin copiar el documento: se buscan con str.find
+    el prefijo y la primera letra en minúscula ("<l") y, solo antes del primer
+    resultado, en mayúscula ("<L"), y de cada candidato se pasa a minúsculas
+    únicamente su nombre ("<LI", "<Li", "<lI").
+    """
+    lower, upper, name, skip, size = memo
+    # Caso habitual en línea: el primer candidato es la etiqueta buscada
+    best = html.find(lower, pos, end)
+    if best != -1:
+        after = best + size
+        if not (after < end and html[after] in _NAME_END and html[best + skip:after] == name):
+            best = _next_name(html, lower, name, best, end, skip, size)
+    if upper is not None:
+        stop = end if best == -1 else best
+        found = html.find(upper, pos, stop)
+        if found != -1:
+            found = _next_name(html, upper, name, found, stop, skip, size)
+            if found != -1:
+                return found
+    return best
+
+
+def _next_name(html, pattern, name, pos, end, skip, size):
+    """
+    Primera aparición de 'pattern' en [pos, end) seguida del nombre 'name' (en
+    cualquier combinación de mayúsculas) y de un delimitador de nombre, o -1.
+    """
+    while True:
+        found = html.find(pattern, pos, end)
+        if found == -1:
+            return -1
+        after = found + size
+        if after < end and html[after] in _NAME_END:
+            text = html[found + skip:after]
+            if text == name or text.lower() == name:
+                return found
+        pos = found + 1
+
+
+def _name_memo(html, prefix, name):
+    """
+    Datos de búsqueda de _find_name para prefix + name ('name' en minúsculas) en
+    un documento del tipo de 'html': el prefijo con la primera letra en
+    minúscula y en mayúscula (None si no cambia), el nombre y las longitudes
+    del prefijo y de la etiqueta (en bytes si el documento es un búfer, donde un
+    nombre no ASCII ocupa más que sus caracteres).
+    """
+    first = name[:1]
+    upper = first.upper()
+    upper = None if upper == first else _literal(html, prefix + upper)
+    literal = _literal(html, name)
+    return (_literal(html, prefix + first), upper, literal,
+            len(prefix), len(prefix) + len(literal))
+
+
+def _close_end(html, pos, size):
+    """
+    Posición tras el '>' de la etiqueta de cierre que empieza en 'pos' (nombre
+    de 'size' caracteres, o bytes si el documento es un búfer).
+    """
+    end = pos + size + 3  # len("</tag>")
+    if end <= len(html) and html[end - 1] in _GT:
+        return end
+    # Cierre con espacios antes del '>' ("</li >")
+    gt_pos = html.find(_literal(html, ">"), pos + size + 2)
+    return len(html) if gt_pos == -1 else gt_pos + 1
+
+
+def _buffer(html):
+    """
+    Documento sobre el que se busca: los str, bytes y bytearray se usan tal cual.
+    Un memoryview no tiene find(), así que se usa el objeto que lo respalda si
+    el view lo cubre entero (memoryview.obj, solo en CPython) o, si no, una copia.
+    """
+    if isinstance(html, memoryview):
+        obj = getattr(html, "obj", None)
+        if (isinstance(obj, (bytes, bytearray)) and len(obj) == len(html) and
+                html.c_contiguous):
+            return obj
+        return bytes(html)
+    return html
+
+
+def _tokenize(html, pos, end):
+    """
+    Genera en orden las etiquetas de html[pos:end] como tuplas
+    (posición de '<', fin del nombre, posición de '>', es_cierre). El nombre es
+    html[inicio + 1:fin] en las aperturas y html[inicio + 2:fin] en los cierres,
+    tal como aparece en el documento (sin pasarlo a minúsculas). Cada '<' se
+    examina por separado, igual que en la búsqueda con str.find. Se detiene en
+    la primera etiqueta incompleta.
+    Los comentarios y las secciones CDATA se saltan enteros, y tras una etiqueta
+    <script> o <style> se salta hasta su cierre, igual que las zonas de
+    _Regions. 'html' puede ser str o bytes.
+    """
+    lt = _literal(html, "<")
+    gt = _literal(html, ">")
+    sections = ((_literal(html, "<!--"), _literal(html, "-->")),
+                (_literal(html, "<![CDATA["), _literal(html, "]]>")))
+    raw_tags = [(name, _literal(html, name)) for name in _RAW_TEXT_TAGS]
+    raw_sizes = [len(name) + 1 for name in _RAW_TEXT_TAGS]
+    while True:
+        pos = html.find(lt, pos, end)
+        if pos == -1 or pos + 1 >= end:
+            return
+        first = html[pos + 1]
+        if first in _SLASH:
+            gt_pos = html.find(gt, pos + 2, end)
+            if gt_pos == -1:
+                return
+            name_end = pos + 2
+            while name_end < gt_pos and html[name_end] not in _NAME_END:
+                name_end += 1
+            yield pos, name_end, gt_pos, True
+        else:
+            if first in _BANG:
+                skipped = False
+                for opener, closer in sections:
+                    if html[pos:pos + len(opener)] == opener:
+                        close = html.find(closer, pos + len(opener), end)
+                        if close == -1:
+                            return
+                        pos = close + len(closer)
+                        skipped = True
+                        break
+                if skipped:
+                    continue
+            name_end = pos + 1
+            while name_end < end and html[name_end] not in _NAME_END:
+                name_end += 1
+            if name_end >= end:
+                return
+            if name_end > pos + 1:
+                gt_pos = html.find(gt, name_end, end)
+                if gt_pos == -1:
+                    return
+                yield pos, name_end, gt_pos, False
+                if name_end - pos in raw_sizes and html[gt_pos - 1] not in _SLASH:
+                    raw = _raw_text_tag(html, pos + 1, name_end, raw_tags)
+                    if raw is not None:
+                        close = _find_name(html, _name_memo(html, "</", raw), gt_pos + 1, end)
+                        if close == -1:
+                            return
+                        pos = close - 1
+        pos += 1
+
+
+def _raw_text_tag(html, name_start, name_end, raw_tags):
+    """
+    Nombre ("script", "style") si html[name_start:name_end] es, sin distinguir
+    mayúsculas, una etiqueta de texto sin marcado. 'raw_tags' son pares
+    (nombre, nombre del tipo del documento).
+    """
+    size = name_end - name_start
+    for name, literal in raw_tags:
+        if size == len(name) and html[name_start:name_end].lower() == literal:
+            return name
+    return None
+
+
+
+# Elementos cuyo contenido es texto sin marcado (se omite al extraer el texto)
+_RAW_TEXT_TAGS = ("script", "style")
+
+# Entidades con nombre decodificadas por get_text/iter_text
+_ENTITIES = {"amp": "&", "lt": "<", "gt": ">", "quot": '"', "apos": "'",
+             "nbsp": "\xa0", "copy": "\xa9", "reg": "\xae", "hellip": "\u2026",
+             "mdash": "\u2014", "ndash": "\u2013", "laquo": "\xab", "raquo": "\xbb",
+             "euro": "\u20ac"}
+
+
+def _iter_text(html, pos, end, encoding="utf-8"):
+    """
+    Genera los tramos de texto de html[pos:end] copiando de una vez lo que hay
+    entre etiquetas. Salta etiquetas, comentarios y el contenido de <script> y
+    <style>, y decodifica las entidades. Si 'html' es bytes, cada tramo se
+    decodifica con 'encoding'.
+    """
+    is_text = isinstance(html, str)
+    lt = _literal(html, "<")
+    gt = _literal(html, ">")
+    while pos < end:
+        lt_pos = html.find(lt, pos, end)
+        text_end = end if lt_pos == -1 else lt_pos
+        if text_end > pos:
+            text = html[pos:text_end]
+            yield _decode_entities(text if is_text else text.decode(encoding))
+        if lt_pos == -1:
+            return
+
+        if html[lt_pos:lt_pos + 4] == _literal(html, "<!--"):
+            close = html.find(_literal(html, "-->"), lt_pos + 4, end)
+            pos = end if close == -1 else close + 3
+            continue
+        gt_pos = html.find(gt, lt_pos, end)
+        if gt_pos == -1:
+            return
+        pos = gt_pos + 1
+
+        # Salta el contenido de <script> y <style> hasta su cierre
+        for name in _RAW_TEXT_TAGS:
+            name_end = lt_pos + 1 + len(name)
+            if (html[lt_pos + 1:name_end].lower() == _literal(html, name) and name_end < end and
+                    html[name_end] in _NAME_END and html[gt_pos - 1] not in _SLASH):
+                close = _find_name(html, _name_memo(html, "</", name), pos, end)
+                pos = end if close == -1 else close
+                break
+
+
+def _decode_entities(text):
+    """Sustituye las entidades con nombre habituales y las numéricas (&#39; &#x27;)."""
+    amp = text.find("&")
+    if amp == -1:
+        return text
+    out = []
+    pos = 0
+    while amp != -1:
+        semi = text.find(";", amp + 1, amp + 12)
+        if semi != -1:
+            entity = text[amp + 1:semi]
+            char = None
+            if entity[:1] == "#":
+                try:
+                    if entity[1:2] in ("x", "X"):
+                        char = chr(int(entity[2:], 16))
+                    else:
+                        char = chr(int(entity[1:]))
+                except (ValueError, OverflowError):
+                    char = None
+            else:
+                char = _ENTITIES.get(entity)
+            if char is not None:
+                out.append(text[pos:amp])
+                out.append(char)
+                pos = semi + 1
+        amp = text.find("&", amp + 1)
+    out.append(text[pos:])
+    return "".join(out)
+
 class Element:
-    def __init__(self, tag, attrs, content, raw_html, self_closing=False):
+    """
+    Elemento encontrado en un documento. En lugar de copias del texto guarda una
+    referencia al documento raíz y las posiciones (inicio, inicio del contenido,
+    fin del contenido, fin); 'content' y 'raw_html' se extraen al consultarlos y
+    las búsquedas anidadas se limitan a ese rango sobre el mismo documento.
+    También puede construirse directamente a partir de 'content' y 'raw_html'.
+    """
+    __slots__ = ("name", "_attrs", "self_closing", "_doc", "_span",
+                 "_content", "_raw_html", "_parser", "_node")
+
+    def __init__(self, tag, attrs, content=None, raw_html=None, self_closing=False,
+                 doc=None, span=None):
         self.name = tag
-        self.attrs = attrs if attrs else {}
-        self.content = content
-        self.raw_html = raw_html
+        # Sin 'attrs', los elementos de un documento analizan sus atributos al consultarlos
+        if attrs is None and doc is None:
+            attrs = {}
+        self._attrs = attrs
         self.self_closing = self_closing
+        self._doc = doc
+        self._span = span
+        self._content = content
+        self._raw_html = raw_html
         # El parser para el contenido interno se inicializa bajo demanda
         self._parser = None
+        # Nodo del índice del documento (para la navegación), resuelto bajo demanda
+        self._node = None
+
+    @property
+    def attrs(self):
+        """Diccionario de atributos de la etiqueta de apertura."""
+        if self._attrs is None:
+            span = self._span
+            self._attrs = self._doc._tag_attrs(self.name, span[0], span[1] - 1)
+        return self._attrs
+
+    @attrs.setter
+    def attrs(self, value):
+        self._attrs = value
+
+    @property
+    def content(self):
+        """Contenido interno del elemento (sin las etiquetas propias)."""
+        if self._content is not None:
+            return self._content
+        if self._doc is None:
+            return ""
+        return self._doc._text(self._span[1], self._span[2])
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+        # Las búsquedas anidadas pasan a usar el contenido asignado
+        self._parser = None
+
+    @property
+    def raw_html(self):
+        """HTML completo del elemento, incluidas sus etiquetas de apertura y cierre."""
+        if self._raw_html is not None:
+            return self._raw_html
+        if self._doc is None:
+            return ""
+        return self._doc._text(self._span[0], self._span[3])
+
+    @raw_html.setter
+    def raw_html(self, value):
+        self._raw_html = value
 
     @property
     def parser(self):
-        """Inicialización perezosa del parser para el contenido interno."""
+        """
+        Inicialización perezosa del parser para el contenido interno. Si el elemento
+        proviene de un documento, es una vista de ese documento limitada al contenido.
+        """
         if self._parser is None and not self.self_closing:
-            self._parser = MicroBS4(self.content)
+            if self._doc is not None and self._content is None:
+                self._parser = self._doc._view(self._span[1], self._span[2])
+            else:
+                self._parser = MicroBS4(self.content)
         return self._parser
 
     def find(self, tag, attrs=None, class_name=None, id=None):
@@ -322,13 +1567,14 @@ class Element:
             return None
         return self.parser.find(tag, attrs, class_name, id)
 
-    def find_all(self, tag, attrs=None, class_name=None, id=None, limit=None):
+    def find_all(self, tag, attrs=None, class_name=None, id=None, limit=None,
+                 workers=None):
         """
         Busca todas las ocurrencias de la etiqueta dentro de este elemento.
         """
         if self.self_closing:
             return []
-        return self.parser.find_all(tag, attrs, class_name, id, limit)
+        return self.parser.find_all(tag, attrs, class_name, id, limit, workers)
 
     def select_one(self, selector):
         """
@@ -338,71 +1584,194 @@ class Element:
             return None
         return self.parser.select_one(selector)
 
-    def select(self, selector):
+    def select(self, selector, limit=None, workers=None):
         """
         Selecciona todos los elementos que coinciden con el selector.
         """
         if self.self_closing:
             return []
-        return self.parser.select(selector)
+        return self.parser.select(selector, limit, workers)
+
+    def iter_all(self, tag, attrs=None, class_name=None, id=None):
+        """
+        Genera las ocurrencias de la etiqueta dentro de este elemento (ver MicroBS4.iter_all).
+        """
+        if self.self_closing:
+            return iter(())
+        return self.parser.iter_all(tag, attrs, class_name, id)
+
+    def iter_select(self, selector):
+        """
+        Genera los elementos que coinciden con el selector dentro de este elemento.
+        """
+        if self.self_closing:
+            return iter(())
+        return self.parser.iter_select(selector)
+
+    def extract(self, fields):
+        """
+        Extrae varios campos dentro de este elemento en una sola pasada (ver MicroBS4.extract).
+        """
+        if self.self_closing:
+            return {field: [] if isinstance(sel, (list, tuple)) else None
+                    for field, sel in fields.items()}
+        return self.parser.extract(fields)
 
     def get_text(self, separator=" "):
         """
-        Extrae el texto del contenido eliminando las etiquetas HTML.
+        Extrae el texto del contenido eliminando las etiquetas HTML, los comentarios
+        y el código de <script>/<style>, con las entidades habituales decodificadas.
+        Las palabras se unen con 'separator'.
         """
         if self.self_closing:
             return ""
-        result = ""
-        i = 0
-        in_tag = False
-        while i < len(self.content):
-            char = self.content[i]
-            if char == "<":
-                in_tag = True
-            elif char == ">":
-                in_tag = False
-            elif not in_tag:
-                result += char
-            i += 1
-        words = [word for word in result.split() if word]
-        return separator.join(words)
+        return separator.join("".join(self.iter_text()).split())
+
+    def iter_text(self):
+        """
+        Genera los fragmentos de texto del contenido (ver get_text) sin construir
+        la cadena completa.
+        """
+        if self.self_closing:
+            return iter(())
+        if self._doc is not None:
+            doc = self._doc
+            return _iter_text(doc.html, self._span[1], self._span[2], doc.encoding)
+        content = self.content
+        return _iter_text(content, 0, len(content))
 
     def children(self, tag=None):
         """
-        Obtiene los elementos hijo directos.
-        Si se especifica 'tag', se filtra por esa etiqueta.
+        Obtiene los elementos hijo directos, de cualquier etiqueta, en orden.
+        Si se especifica 'tag' (uno o varios nombres separados por comas), se
+        filtra por esa etiqueta.
         """
         if self.self_closing:
             return []
-        all_tags = tag.split(',') if tag else [
-            "div", "p", "span", "a", "ul", "ol", "li", "h1", "h2", "h3",
-            "h4", "h5", "h6", "table", "tr", "td", "th", "img", "form",
-            "input", "button", "select", "option", "textarea", "label", "br", "hr",
-            "header", "footer", "nav", "section", "article", "aside", "main"
-        ]
+        names = [t.strip().lower() for t in tag.split(',')] if tag else None
+        doc = self._doc
+        if doc is not None and not doc.indexed:
+            # Sin índice: una pasada por el contenido siguiendo la profundidad;
+            # los hijos son las aperturas sin padre dentro del rango
+            if not _is_container(self.name):
+                return []
+            tree = _ScanTree(doc)
+            span = self._span
+            return [tree.element(node) for node in tree.openings(span[1], span[2], span[0])
+                    if node[3] is None and node[2][0] not in "!?" and
+                    (names is None or node[2] in names)]
+        doc, node = self._doc_node()
+        index = doc._get_index()
+        parents = index.parents
+        name_ids = index.name_ids
+        tag_names = index.tag_names
         children = []
-        for t in all_tags:
-            t = t.strip()
-            elems = self.parser.find_all(t)
-            for elem in elems:
-                if self._is_direct_child(elem):
-                    children.append(elem)
+        # Los descendientes de un nodo son los nodos siguientes hasta el primero
+        # cuyo padre es anterior a él; los hijos son los de padre == node
+        child = node + 1
+        while child < len(parents) and parents[child] >= node:
+            if parents[child] == node:
+                name = tag_names[name_ids[child]]
+                if name[0] not in "!?" and (names is None or name in names):
+                    children.append(doc._node_element(child))
+            child += 1
         return children
 
-    def _is_direct_child(self, potential_child):
+    @property
+    def parent(self):
+        """Elemento que contiene a este, o None en el nivel superior."""
+        if self._doc is None:
+            return None
+        if not self._doc.indexed:
+            tree = self._doc._ancestor_tree()
+            parent = tree.parent_at(self._span[0])
+            return None if parent is None else tree.element(parent)
+        doc, node = self._doc_node()
+        parent = doc._get_index().parents[node]
+        return None if parent == -1 else doc._node_element(parent)
+
+    @property
+    def next_sibling(self):
+        """Siguiente elemento con el mismo padre, o None."""
+        if self._doc is None:
+            return None
+        if not self._doc.indexed:
+            return self._scan_sibling()
+        doc, node = self._doc_node()
+        index = doc._get_index()
+        parents = index.parents
+        parent = parents[node]
+        # Salta los descendientes de este nodo
+        sibling = node + 1
+        while sibling < len(parents) and parents[sibling] >= node:
+            sibling += 1
+        while sibling < len(parents) and parents[sibling] == parent:
+            if index.name(sibling)[0] not in "!?":
+                return doc._node_element(sibling)
+            sibling += 1
+        return None
+
+    @property
+    def descendants(self):
+        """Genera todos los elementos contenidos en este, en orden de documento."""
+        if self.self_closing:
+            return
+        doc = self._doc
+        if doc is not None and not doc.indexed:
+            if not _is_container(self.name):
+                return
+            tree = _ScanTree(doc)
+            span = self._span
+            for node in tree.openings(span[1], span[2], span[0]):
+                if node[2][0] not in "!?":
+                    yield tree.element(node)
+            return
+        doc, node = self._doc_node()
+        index = doc._get_index()
+        parents = index.parents
+        name_ids = index.name_ids
+        tag_names = index.tag_names
+        child = node + 1
+        while child < len(parents) and parents[child] >= node:
+            if tag_names[name_ids[child]][0] not in "!?":
+                yield doc._node_element(child)
+            child += 1
+
+    def _scan_sibling(self):
         """
-        Heurística para determinar si un elemento es hijo directo basándose en la posición.
+        next_sibling sin índice: la primera apertura tras este elemento con el
+        mismo padre. Si la siguiente apertura tiene otro padre, el padre común
+        ya se ha cerrado y no hay más hermanos.
         """
-        child_html = potential_child.raw_html
-        child_start = self.content.find(child_html)
-        if child_start == -1:
-            return False
-        prefix = self.content[:child_start]
-        last_close_tag = prefix.rfind(">")
-        if last_close_tag == -1:
-            return True
-        between = prefix[last_close_tag + 1:].strip()
-        return not between or between.isspace()
+        doc = self._doc
+        tree = doc._ancestor_tree()
+        span = self._span
+        parent = tree.parent_at(span[0])
+        # Un elemento que no contiene a nadie acaba en su '>'
+        if self.self_closing or not _is_container(self.name):
+            pos = span[1]
+        else:
+            pos = span[3]
+        for start, name_end, gt_pos, closing in _tokenize(doc.html, pos, doc.length):
+            if closing:
+                continue
+            node = tree.node_at(start)
+            if node is None or node[3] is not parent:
+                return None
+            if node[2][0] not in "!?":
+                return tree.element(node)
+        return None
+
+    def _doc_node(self):
+        """
+        Devuelve (documento, nodo del índice) de este elemento. Un elemento creado
+        sin documento usa su parser interno y el nodo -1 (la raíz virtual).
+        """
+        if self._doc is None:
+            return self.parser, -1
+        if self._node is None:
+            self._node = self._doc._node_at(self._span[0])
+        return self._doc, self._node
 
     def find_list_items(self):
         """Si el elemento es una lista (<ul> o <ol>), retorna sus <li>."""
@@ -430,3 +1799,525 @@ class Element:
             attrs_str = ' '.join([f'{k}="{v}"' for k, v in self.attrs.items()])
             return f"<{self.name} {attrs_str}>"
 
+
+class Selector:
+    """
+    Selector CSS compilado y reutilizable (ver compile_selector). Soporta:
+      - Etiqueta y universal: div, *
+      - Clases (una o varias) e ID: .item, .multi.class, #content, li.item#first
+      - Atributos: [href], [type=text], [href^=http], [src$=.png], [title*=hola],
+        [rel~=nofollow]
+      - Combinadores descendiente (ul li) e hijo (ul > li)
+      - Grupos: h1, h2
+    La comprobación va de derecha a izquierda: primero el último compuesto contra
+    cada candidato y después los ancestros siguiendo los combinadores.
+    """
+    def __init__(self, text):
+        self.text = text
+        # Cada grupo es una lista de (compuesto, combinador) de derecha a izquierda
+        self._groups = [_parse_complex(part) for part in _split_groups(text)]
+        # Nombres de etiqueta que puede tener el elemento final (None si alguno es '*')
+        names = []
+        for parts in self._groups:
+            tag = parts[0][0].tag
+            if tag is None:
+                names = None
+                break
+            if tag not in names:
+                names.append(tag)
+        self._names = names
+
+    def _is_simple(self):
+        """Indica si ningún grupo usa combinadores (cada elemento se evalúa solo)."""
+        for parts in self._groups:
+            if len(parts) > 1:
+                return False
+        return True
+
+    def select(self, soup, limit=None):
+        """Elementos de 'soup' (dentro de su rango) que coinciden, en orden de documento."""
+        return _take(self.iter_select(soup), limit)
+
+    def iter_select(self, soup):
+        """Como select, pero genera los elementos de uno en uno."""
+        tree = soup._tree()
+        for node in tree.nodes(self._names):
+            if self._matches(tree, node):
+                yield tree.element(node)
+
+    def _matches(self, tree, node):
+        for parts in self._groups:
+            if parts[0][0].matches(tree, node) and _match_ancestors(parts, 1, node, tree):
+                return True
+        return False
+
+    def __repr__(self):
+        return f"Selector({self.text!r})"
+
+
+class _Compound:
+    """Selector compuesto: etiqueta opcional y lista de pruebas (atributo, operador, valor)."""
+    __slots__ = ("tag", "tests")
+
+    def __init__(self):
+        self.tag = None
+        self.tests = []
+
+    def matches(self, tree, node):
+        name = tree.name(node)
+        if self.tag is None:
+            # El selector universal no incluye comentarios ni declaraciones (<!...>, <?...>)
+            if name[0] in "!?":
+                return False
+        elif name != self.tag:
+            return False
+        if not self.tests:
+            return True
+
+        attrs = tree.attrs(node)
+        for attr, op, value in self.tests:
+            actual = attrs.get(attr)
+            if actual is None:
+                return False
+            if op is None:
+                continue
+            if actual is True:
+                actual = ""
+            if op == "=":
+                ok = actual == value
+            elif op == "~=":
+                ok = value in actual.split()
+            elif op == "^=":
+                ok = value != "" and actual.startswith(value)
+            elif op == "$=":
+                ok = value != "" and actual.endswith(value)
+            else:  # "*="
+                ok = value != "" and value in actual
+            if not ok:
+                return False
+        return True
+
+
+class _IndexTree:
+    """Acceso a nombre, atributos y padre de los nodos del índice para los selectores."""
+    def __init__(self, soup):
+        index = soup._get_index()
+        self.soup = soup
+        self.index = index
+        self.name = index.name
+        self.parents = index.parents
+        self._attrs = {}
+
+    def nodes(self, names):
+        """Nodos del rango de búsqueda con nombre en 'names' (todos si es None), en orden."""
+        index = self.index
+        starts = index.starts
+        gts = index.gts
+        if names is None:
+            nodes = range(len(starts))
+        elif len(names) == 1:
+            nodes = index.by_name.get(names[0], ())
+        else:
+            nodes = []
+            for name in names:
+                nodes.extend(index.by_name.get(name, ()))
+            nodes.sort()
+        hi = self.soup._hi
+        k = _lower_bound(nodes, starts, self.soup._lo)
+        while k < len(nodes):
+            node = nodes[k]
+            k += 1
+            if starts[node] >= hi:
+                break
+            if gts[node] < hi:
+                yield node
+
+    def element(self, node):
+        return self.soup._node_element(node)
+
+    def attrs(self, node):
+        attrs = self._attrs.get(node)
+        if attrs is None:
+            attrs = self._attrs[node] = self.soup._node_attrs(node)
+        return attrs
+
+    def parent(self, node):
+        # Como en BeautifulSoup, los ancestros fuera del rango de búsqueda también
+        # cuentan para los combinadores; el rango solo limita los candidatos
+        parent = self.parents[node]
+        return None if parent == -1 else parent
+
+
+class _ScanTree:
+    """
+    Acceso a nombre, atributos y padre para los selectores sin índice. Los
+    candidatos se buscan con str.find por nombre (ver _find_tag), o tokenizando
+    el rango con '*', y su padre se calcula solo si un combinador lo pide,
+    recorriendo el documento hacia delante hasta el candidato (ver openings).
+    Cada nodo es una lista [posición de '<', posición de '>', nombre, padre,
+    atributos]; el padre es None en el primer nivel y -1 mientras no se ha
+    calculado.
+    """
+    def __init__(self, soup):
+        self.soup = soup
+        self.html = soup.html
+        self._encoding = None if isinstance(soup.html, str) else soup.encoding
+        self._frozen = isinstance(soup.html, bytearray)
+        # Nombre tal como aparece en el documento -> (en minúsculas, es contenedor)
+        self._names = {}
+        # Recorrido de parent_at: generador de openings, última posición pedida
+        # y primera apertura leída en o tras ella
+        self._walk = None
+        self._reached = 0
+        self._last = None
+
+    def _name(self, raw):
+        """Entrada de _names para la grafía 'raw': se decodifica una vez por grafía."""
+        if self._frozen:
+            raw = bytes(raw)
+        entry = self._names.get(raw)
+        if entry is None:
+            name = (raw.decode(self._encoding) if self._encoding else raw).lower()
+            entry = self._names[raw] = (name, _is_container(name))
+        return entry
+
+    def nodes(self, names):
+        """Candidatos del rango de búsqueda con nombre en 'names' (todos si es None), en orden."""
+        soup = self.soup
+        html = self.html
+        lo = soup._lo
+        hi = soup._hi
+        if names is None:
+            # Un rango que empieza dentro de <script> no tiene etiquetas hasta su cierre
+            skip = soup._get_regions().end_at(lo)
+            for start, name_end, gt_pos, closing in _tokenize(html, lo if skip == -1 else skip, hi):
+                if not closing:
+                    yield [start, gt_pos, self._name(html[start + 1:name_end])[0], -1, None]
+            return
+        gt = _literal(html, ">")
+        find = soup._find_tag
+        heads = []
+        for name in names:
+            start = find(name, False, lo, hi)
+            if start != -1:
+                heads.append([start, name])
+        while heads:
+            head = min(heads)
+            start = head[0]
+            gt_pos = html.find(gt, start, hi)
+            if gt_pos == -1:
+                # Sin '>' antes del fin del rango no queda ninguna etiqueta completa
+                return
+            yield [start, gt_pos, head[1], -1, None]
+            head[0] = find(head[1], False, start + 1, hi)
+            if head[0] == -1:
+                heads.remove(head)
+
+    def element(self, node):
+        element, _ = self.soup._build_element(node[2], node[0], node[1], None)
+        return element
+
+    def name(self, node):
+        return node[2]
+
+    def attrs(self, node):
+        attrs = node[4]
+        if attrs is None:
+            attrs = node[4] = self.soup._tag_attrs(node[2], node[0], node[1])
+        return attrs
+
+    def parent(self, node):
+        parent = node[3]
+        if parent == -1:
+            parent = node[3] = self.parent_at(node[0])
+        return parent
+
+    def parent_at(self, pos):
+        """Contenedor abierto en la etiqueta que empieza en 'pos' (None en el primer nivel)."""
+        node = self.node_at(pos)
+        return None if node is None else node[3]
+
+    def node_at(self, pos):
+        """Nodo de la primera apertura en 'pos' o después (ver openings), o None."""
+        token = self._last
+        if self._walk is None or pos < self._reached:
+            # Las posiciones crecientes continúan el mismo recorrido
+            self._walk = self.openings(0, self.soup.length)
+            token = None
+        self._reached = pos
+        if token is None or token[0] < pos:
+            token = None
+            for token in self._walk:
+                if token[0] >= pos:
+                    break
+            else:
+                token = None
+            self._last = token
+        return token
+
+    def _encloses(self, owner, pos):
+        """Indica si la apertura en 'owner' contiene a la primera apertura en 'pos' o después."""
+        node = self.soup._ancestor_tree().node_at(pos)
+        if node is None:
+            return False
+        node = node[3]
+        while node is not None:
+            if node[0] == owner:
+                return True
+            node = node[3]
+        return False
+
+    def openings(self, lo, hi, owner=None):
+        """
+        Genera las aperturas de html[lo:hi] en orden como nodos [posición de '<',
+        posición de '>', nombre, padre, None], con el padre ya calculado (None en
+        el primer nivel del rango). Los cierres se resuelven con una pila por
+        nombre y solo los contenedores pueden ser padres, como en _build_index.
+        Si el rango es el contenido del elemento que empieza en 'owner', un
+        cierre sin apertura en el rango puede cerrar un ancestro y con él el
+        elemento (<b><p></b>): entonces se comprueba en el recorrido del
+        documento (ver _encloses) y, si ya está cerrado, se termina.
+        """
+        html = self.html
+        names = self._names
+        frozen = self._frozen
+        if lo:
+            # Un rango que empieza dentro de <script> no tiene etiquetas hasta su cierre
+            skip = self.soup._get_regions().end_at(lo)
+            if skip != -1:
+                lo = skip
+        containers = []
+        in_containers = set()  # inicios de los nodos de 'containers'
+        opened = {}            # nombre -> pila de contenedores abiertos
+        for start, name_end, gt_pos, closing in _tokenize(html, lo, hi):
+            raw = html[start + (2 if closing else 1):name_end]
+            entry = names.get(bytes(raw) if frozen else raw)
+            if entry is None:
+                entry = self._name(raw)
+            if closing:
+                stack = opened.get(entry[0])
+                # Un cierre dentro del propio texto de la etiqueta abierta no cuenta
+                if stack and stack[-1][1] < start:
+                    node = stack.pop()
+                    if node[0] in in_containers:
+                        # Cierra también los elementos abiertos dentro sin cierre propio
+                        while True:
+                            top = containers.pop()
+                            in_containers.discard(top[0])
+                            if top is node:
+                                break
+                elif owner is not None and entry[1] and not self._encloses(owner, start):
+                    return
+                continue
+            name = entry[0]
+            node = [start, gt_pos, name, containers[-1] if containers else None, None]
+            if entry[1] and html[gt_pos - 1] not in _SLASH:
+                stack = opened.get(name)
+                if stack is None:
+                    stack = opened[name] = []
+                stack.append(node)
+                containers.append(node)
+                in_containers.add(start)
+            yield node
+
+
+def _match_ancestors(parts, i, node, tree):
+    """Comprueba los compuestos parts[i:] contra los ancestros de 'node'."""
+    if i == len(parts):
+        return True
+    compound, combinator = parts[i]
+    node = tree.parent(node)
+    if combinator == ">":
+        return (node is not None and compound.matches(tree, node) and
+                _match_ancestors(parts, i + 1, node, tree))
+    while node is not None:
+        if compound.matches(tree, node) and _match_ancestors(parts, i + 1, node, tree):
+            return True
+        node = tree.parent(node)
+    return False
+
+
+# Caracteres que terminan un nombre de etiqueta, clase o id dentro de un selector
+_SELECTOR_STOP = " \t\n>,.#[]:*=()+~"
+
+
+def _split_groups(text):
+    """Separa un selector por las comas de nivel superior (fuera de [] y comillas)."""
+    groups = []
+    depth = 0
+    quote = None
+    start = 0
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "[":
+            depth += 1
+        elif char == "]":
+            depth -= 1
+        elif char == "," and depth == 0:
+            groups.append(text[start:i].strip())
+            start = i + 1
+    groups.append(text[start:].strip())
+    return groups
+
+
+def _parse_complex(text):
+    """Convierte 'ul > li.item a' en [(a, ' '), (li.item, '>'), (ul, None)] invertido."""
+    if not text:
+        raise ValueError("selector vacío")
+    compounds = []
+    combinators = []
+    combinator = None
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char in " \t\n":
+            if compounds and combinator is None:
+                combinator = " "
+            i += 1
+        elif char == ">":
+            if not compounds:
+                raise ValueError("selector no soportado: " + text)
+            combinator = ">"
+            i += 1
+        else:
+            if compounds:
+                if combinator is None:
+                    raise ValueError("selector no soportado: " + text)
+                combinators.append(combinator)
+            compound, i = _parse_compound(text, i)
+            compounds.append(compound)
+            combinator = None
+    if combinator == ">":
+        raise ValueError("selector no soportado: " + text)
+
+    parts = [(compounds[-1], None)]
+    for j in range(len(compounds) - 2, -1, -1):
+        parts.append((compounds[j], combinators[j]))
+    return parts
+
+
+def _ident_end(text, i):
+    while i < len(text) and text[i] not in _SELECTOR_STOP:
+        i += 1
+    return i
+
+
+def _parse_compound(text, i):
+    """Lee un selector compuesto (tag.clase#id[attr]) desde 'i'; devuelve (compuesto, fin)."""
+    compound = _Compound()
+    start = i
+    if text[i] == "*":
+        i += 1
+    else:
+        j = _ident_end(text, i)
+        if j > i:
+            compound.tag = text[i:j].lower()
+            i = j
+
+    while i < len(text):
+        char = text[i]
+        if char == "." or char == "#":
+            j = _ident_end(text, i + 1)
+            if j == i + 1:
+                raise ValueError("selector no soportado: " + text)
+            if char == ".":
+                compound.tests.append(("class", "~=", text[i + 1:j]))
+            else:
+                compound.tests.append(("id", "=", text[i + 1:j]))
+            i = j
+        elif char == "[":
+            i = _parse_attr_test(text, i + 1, compound.tests)
+        else:
+            break
+
+    if i == start or (i < len(text) and text[i] not in " \t\n>"):
+        raise ValueError("selector no soportado: " + text)
+    return compound, i
+
+
+def _parse_attr_test(text, i, tests):
+    """Lee '[attr]' o '[attr<op>valor]' desde después de '['; devuelve la posición tras ']'."""
+    n = len(text)
+    j = i
+    while j < n and text[j] not in "=^$*~]":
+        j += 1
+    name = text[i:j].strip()
+    if not name or j >= n:
+        raise ValueError("selector no soportado: " + text)
+    if text[j] == "]":
+        tests.append((name, None, None))
+        return j + 1
+
+    op = "=" if text[j] == "=" else text[j:j + 2]
+    if op not in ("=", "^=", "$=", "*=", "~="):
+        raise ValueError("selector no soportado: " + text)
+    j += len(op)
+    while j < n and text[j] in " \t\n":
+        j += 1
+    if j < n and text[j] in "\"'":
+        value_end = text.find(text[j], j + 1)
+        if value_end == -1:
+            raise ValueError("selector no soportado: " + text)
+        value = text[j + 1:value_end]
+        j = value_end + 1
+    else:
+        value_end = text.find("]", j)
+        if value_end == -1:
+            raise ValueError("selector no soportado: " + text)
+        value = text[j:value_end].strip()
+        j = value_end
+    while j < n and text[j] in " \t\n":
+        j += 1
+    if j >= n or text[j] != "]":
+        raise ValueError("selector no soportado: " + text)
+    tests.append((name, op, value))
+    return j + 1
+
+
+# Selectores compilados por texto, para no volver a analizarlos en cada consulta
+_selector_cache = _LRUCache(64)
+
+
+def _group_text(selectors):
+    """Une una lista de selectores (textos o Selector) en un solo grupo CSS."""
+    if not selectors:
+        raise ValueError("lista de selectores vacía")
+    return ", ".join(selector.text if isinstance(selector, Selector) else selector
+                     for selector in selectors)
+
+
+def compile_selector(selector):
+    """
+    Compila un selector CSS y devuelve un Selector reutilizable. Los selectores
+    compilados se guardan por texto, así que repetir la misma cadena es gratis.
+    """
+    compiled = _selector_cache.get(selector)
+    if compiled is None:
+        compiled = Selector(selector)
+        _selector_cache.put(selector, compiled)
+    return compiled
+
+
+# Funciones opcionales que viven en módulos aparte y se importan al usarlas por
+# primera vez, para que importar microbs4 compile y cargue solo el núcleo
+_LAZY = {
+    "StreamParser": "microbs4_stream",
+    "aselect": "microbs4_stream",
+    "parse_many": "microbs4_pool",
+    "ParseStats": "microbs4_stats",
+    "DiskCache": "microbs4_cache",
+}
+
+
+def __getattr__(name):
+    """Resuelve 'from microbs4 import StreamParser' y similares cargando su módulo."""
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(name)
+    value = getattr(__import__(module), name)
+    globals()[name] = value
+    return value
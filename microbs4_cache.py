@@ -0,0 +1,257 @@
+# microbs4_cache.py - Caché persistente de resultados de MicroBS4 (MicroBS4(html, disk_cache=...))
+# Se importa solo cuando se pide, para que el núcleo no cargue os ni hashlib.
+# Guarda los resultados de find_all y select en disco por (hash del
+# contenido, consulta): volver a recibir la misma página responde las mismas
+# consultas sin analizarla.
+
+import os
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ucollections import OrderedDict
+
+try:
+    from hashlib import sha256
+except ImportError:
+    from uhashlib import sha256
+
+try:
+    from binascii import hexlify
+except ImportError:
+    from ubinascii import hexlify
+
+from microbs4 import Element
+
+
+class DiskCache:
+    """
+    Caché de resultados en un directorio, compartida entre documentos y entre
+    ejecuciones. Cada entrada es un archivo pequeño con el hash del documento,
+    la consulta y, por resultado, su etiqueta y sus posiciones en el documento;
+    atributos y texto se extraen de esas posiciones al consultarlos, como en
+    cualquier Element.
+    El directorio se limita a 'max_bytes': al superarlo se borran las entradas
+    usadas hace más tiempo. Solo se escribe al guardar un resultado nuevo (nunca
+    al leer) y cada entrada se escribe una vez, así que sirve también para la
+    flash de una placa con MicroPython. 'path' debe estar en un directorio que
+    ya exista (se crea solo el último nivel).
+    """
+    def __init__(self, path, max_bytes=64 * 1024):
+        self.path = path.rstrip("/") or "/"
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Tamaño de cada entrada, de la usada hace más tiempo a la más reciente.
+        # Al abrir el directorio el orden es el de escritura (fecha del archivo)
+        self._sizes = OrderedDict()
+        try:
+            os.mkdir(self.path)
+        except OSError:
+            pass
+        entries = []
+        for name in os.listdir(self.path):
+            file_path = self._file(name)
+            if name.endswith(".tmp"):
+                # Escritura interrumpida
+                os.remove(file_path)
+                continue
+            info = os.stat(file_path)
+            entries.append((info[8], name, info[6]))
+        entries.sort()
+        for _, name, size in entries:
+            self._sizes[name] = size
+            self.bytes += size
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def _file(self, name):
+        return self.path + "/" + name
+
+    def get(self, digest, query):
+        """
+        Registros (nombre, auto-cierre, posiciones) guardados para la consulta
+        'query' (texto) sobre el documento con hash 'digest', o None.
+        """
+        name = _entry_name(digest, query)
+        size = self._sizes.pop(name, None)
+        if size is None:
+            self.misses += 1
+            return None
+        try:
+            with open(self._file(name)) as f:
+                lines = f.read().split("\n")
+        except OSError:
+            self.bytes -= size
+            self.misses += 1
+            return None
+        self._sizes[name] = size
+        # La cabecera descarta colisiones del nombre del archivo
+        if lines[0] != digest + " " + query:
+            self.misses += 1
+            return None
+        records = []
+        for line in lines[1:]:
+            if line:
+                fields = line.split(" ")
+                records.append((fields[0], fields[1] == "1",
+                                tuple(int(pos) for pos in fields[2:6])))
+        self.hits += 1
+        return records
+
+    def put(self, digest, query, records):
+        """Guarda los registros de la consulta y expulsa las entradas más antiguas si no caben."""
+        lines = [digest + " " + query]
+        for tag, self_closing, span in records:
+            lines.append("%s %d %d %d %d %d" % ((tag, self_closing) + tuple(span)))
+        data = "\n".join(lines) + "\n"
+        size = len(data.encode())
+        if size > self.max_bytes:
+            return
+        name = _entry_name(digest, query)
+        self._remove(name)
+        while self._sizes and self.bytes + size > self.max_bytes:
+            # La primera entrada es la usada hace más tiempo
+            self._remove(next(iter(self._sizes)))
+            self.evictions += 1
+        # Se escribe aparte y se renombra: una entrada nunca queda a medias
+        tmp = self._file(name + ".tmp")
+        with open(tmp, "w") as f:
+            f.write(data)
+        os.rename(tmp, self._file(name))
+        self._sizes[name] = size
+        self.bytes += size
+
+    def _remove(self, name):
+        size = self._sizes.pop(name, None)
+        if size is None:
+            return
+        self.bytes -= size
+        try:
+            os.remove(self._file(name))
+        except OSError:
+            pass
+
+    def clear(self):
+        """Borra todas las entradas."""
+        for name in list(self._sizes):
+            self._remove(name)
+
+    def info(self):
+        """Estadísticas de la caché, como MicroBS4.cache_info()."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._sizes),
+            "bytes": self.bytes,
+        }
+
+
+class _DiskTier:
+    """
+    Caché de resultados de un documento con la caché persistente detrás de la
+    de memoria: lo que no está en memoria se busca en disco, y las listas de
+    find_all/select del documento completo se guardan también en disco. Tiene
+    la interfaz de _LRUCache, así que el núcleo no sabe que existe.
+    """
+    def __init__(self, soup, memory, disk):
+        self._soup = soup
+        self._memory = memory
+        self._disk = disk
+        self._digest = None
+
+    def __len__(self):
+        return len(self._memory)
+
+    @property
+    def hits(self):
+        return self._memory.hits
+
+    @property
+    def misses(self):
+        return self._memory.misses
+
+    @property
+    def evictions(self):
+        return self._memory.evictions
+
+    @property
+    def bytes(self):
+        return self._memory.bytes
+
+    def _query(self, key):
+        """Texto de la consulta en disco, o None si el resultado no se guarda allí."""
+        # Solo las listas de find_all ("all") y select sobre el documento entero;
+        # las búsquedas anidadas dependen del elemento del que parten
+        if key[0] not in ("all", "select") or key[-2] != 0 or key[-1] != self._soup.length:
+            return None
+        if self._digest is None:
+            self._digest = document_digest(self._soup.html)
+        return repr(key[:-2])
+
+    def get(self, key):
+        value = self._memory.get(key)
+        if value is not None:
+            return value
+        query = self._query(key)
+        if query is None:
+            return None
+        records = self._disk.get(self._digest, query)
+        if records is None:
+            return None
+        soup = self._soup
+        value = tuple(Element(tag, None, self_closing=self_closing, doc=soup, span=span)
+                      for tag, self_closing, span in records)
+        self._memory.put(key, value, sum(span[3] - span[0] for _, _, span in records))
+        return value
+
+    def put(self, key, value, size=0):
+        self._memory.put(key, value, size)
+        query = self._query(key)
+        if query is None:
+            return
+        for element in value:
+            if element._span is None:
+                return
+        self._disk.put(self._digest, query,
+                       [(element.name, element.self_closing, element._span) for element in value])
+
+    def clear(self):
+        self._memory.clear()
+
+
+def document_digest(html):
+    """
+    Hash (hexadecimal) del contenido del documento. Los documentos str se
+    codifican por trozos para no copiarlos enteros; el tipo forma parte del hash
+    porque las posiciones de un str son de caracteres y las de bytes, de bytes.
+    """
+    h = sha256()
+    if isinstance(html, str):
+        h.update(b"s")
+        for i in range(0, len(html), 4096):
+            h.update(html[i:i + 4096].encode())
+    else:
+        h.update(b"b")
+        h.update(html)
+    return hexlify(h.digest()).decode()
+
+
+def _entry_name(digest, query):
+    """Nombre de archivo de la entrada: hash corto del documento y la consulta."""
+    return hexlify(sha256((digest + query).encode()).digest()[:10]).decode()
+
+
+def _attach(soup, disk_cache):
+    """
+    Pone la caché persistente 'disk_cache' (DiskCache o ruta de su directorio)
+    detrás de la caché de resultados de 'soup'; las vistas la comparten.
+    """
+    if isinstance(disk_cache, str):
+        disk_cache = DiskCache(disk_cache)
+    soup.disk_cache = disk_cache
+    soup._cache = _DiskTier(soup, soup._cache, disk_cache)
@@ -0,0 +1,97 @@
+# microbs4_pool.py - Procesamiento en paralelo de MicroBS4 (parse_many, workers=)
+# Se importa la primera vez que se usa parse_many o una búsqueda con workers=.
+# Sus funciones viven a nivel de módulo para que los procesos del pool puedan
+# importarlas sin cargar nada más.
+
+from microbs4 import MicroBS4, Selector, _group_text
+
+
+def parse_many(documents, selectors, workers=None, chunksize=16, encoding="utf-8"):
+    """
+    Analiza muchos documentos repartiéndolos entre procesos
+    (concurrent.futures.ProcessPoolExecutor, CPython) y devuelve un resultado
+    por documento, en el mismo orden.
+    'selectors' es un selector (texto o Selector), y entonces cada resultado es
+    la lista de coincidencias como en select(), o un diccionario de campos como
+    el de extract(). Cada coincidencia es un diccionario ligero y serializable
+    {"tag", "attrs", "text", "start", "end"} en lugar de un Element.
+    'workers' es el número de procesos (None: uno por núcleo; 1: sin procesos,
+    en el propio intérprete, también en MicroPython) o un Executor ya creado.
+    Los documentos se envían en lotes de 'chunksize' para repartir el coste de
+    la comunicación entre procesos.
+    """
+    spec = _selector_spec(selectors)
+    if workers == 1:
+        return [_parse_one(spec, encoding, document) for document in documents]
+    from functools import partial
+    return _pool_map(partial(_parse_one, spec, encoding), documents, workers, chunksize)
+
+
+def _selector_spec(selectors):
+    """Versión serializable de los selectores de parse_many (solo textos)."""
+    if isinstance(selectors, Selector):
+        return selectors.text
+    if isinstance(selectors, str):
+        return selectors
+    spec = {}
+    for field, selector in selectors.items():
+        if isinstance(selector, (list, tuple)):
+            spec[field] = [_group_text(selector)]
+        else:
+            spec[field] = selector.text if isinstance(selector, Selector) else selector
+    return spec
+
+
+def _parse_one(spec, encoding, document):
+    """Analiza un documento en un proceso de parse_many."""
+    soup = MicroBS4(document, cache_size=0, encoding=encoding)
+    if isinstance(spec, str):
+        return [_match_info(element) for element in soup.iter_select(spec)]
+    results = soup.extract(spec)
+    for field, value in results.items():
+        if isinstance(value, list):
+            results[field] = [_match_info(element) for element in value]
+        elif value is not None:
+            results[field] = _match_info(value)
+    return results
+
+
+def _match_info(element):
+    """Resumen serializable de un Element: etiqueta, atributos, texto y posiciones."""
+    return {
+        "tag": element.name,
+        "attrs": element.attrs,
+        "text": element.get_text(),
+        "start": element._span[0],
+        "end": element._span[3],
+    }
+
+
+def _search_chunk(job):
+    """
+    Busca en un trozo del documento para _parallel_search y devuelve
+    (nombre, auto-cierre, posiciones) de cada resultado, ya desplazadas al
+    documento completo.
+    """
+    (kind, query, attrs), chunk, offset, indexed, encoding = job
+    soup = MicroBS4(chunk, indexed=indexed, cache_size=0, encoding=encoding)
+    if kind == "all":
+        found = soup._iter_all(query, attrs)
+    else:
+        found = soup.iter_select(query)
+    return [(element.name, element.self_closing, tuple(pos + offset for pos in element._span))
+            for element in found]
+
+
+def _pool_map(func, items, workers, chunksize=1):
+    """
+    Aplica 'func' a 'items' en un Executor y devuelve la lista de resultados en
+    orden. 'workers' es un Executor ya creado o el número de procesos del
+    ProcessPoolExecutor que se crea para la llamada (None: uno por núcleo).
+    """
+    if hasattr(workers, "map"):
+        return list(workers.map(func, items, chunksize=chunksize))
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(func, items, chunksize=chunksize))
+
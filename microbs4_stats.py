@@ -0,0 +1,197 @@
+# microbs4_stats.py - Estadísticas de búsqueda de MicroBS4 (MicroBS4(html, stats=...))
+# Se importa solo cuando se piden estadísticas, para que el núcleo no cargue
+# los contadores ni los envoltorios de medición.
+
+try:
+    from time import ticks_diff, ticks_us
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(end, start):
+        return end - start
+
+
+class ParseStats:
+    """
+    Estadísticas de las búsquedas de uno o varios documentos (MicroBS4(html,
+    stats=...)). Contadores:
+      - bytes_scanned: bytes recorridos al buscar, tokenizar y emparejar cierres
+      - candidates / matches: etiquetas examinadas y las que coincidieron
+      - attr_parses: cadenas de atributos analizadas
+      - cache_hits / cache_misses / cache_evictions: actividad de la caché de resultados
+      - nested_parsers: vistas creadas para búsquedas anidadas en un Element
+      - index_builds / pair_tables: índices y tablas de pares construidos
+      - calls: operaciones públicas (find, find_all, select, select_one, extract)
+    'times_us' acumula microsegundos por fase ("scan", "indexed", "attrs",
+    "index", "pairing") y por operación pública; el tiempo de una fase incluye
+    el de las fases que llama. Si se indica 'callback', se llama con
+    (operación, stats) al terminar cada operación pública.
+    """
+    COUNTERS = ("bytes_scanned", "candidates", "matches", "attr_parses", "cache_hits",
+                "cache_misses", "cache_evictions", "nested_parsers", "index_builds",
+                "pair_tables", "calls")
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.reset()
+
+    def reset(self):
+        """Pone a cero contadores y tiempos."""
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.times_us = {}
+        self._depth = 0
+
+    def add_time(self, phase, t0):
+        """Suma a 'phase' el tiempo transcurrido desde 't0' (ticks_us)."""
+        self.times_us[phase] = self.times_us.get(phase, 0) + ticks_diff(ticks_us(), t0)
+
+    def as_dict(self):
+        """Contadores y tiempos como diccionario (para exportarlos)."""
+        result = {name: getattr(self, name) for name in self.COUNTERS}
+        result["times_us"] = dict(self.times_us)
+        return result
+
+
+def _instrument(soup, stats):
+    """
+    Activa las estadísticas en 'soup' sustituyendo en la instancia los métodos
+    medidos; las vistas que cree para búsquedas anidadas se instrumentan igual.
+    """
+    soup.stats = stats
+    find_tag = soup._find_tag
+    find_scan = soup._find_scan
+    find_indexed = soup._find_indexed
+    build_match = soup._build_match
+    tree = soup._tree
+    parse_attrs = soup._parse_attrs
+    build_index = soup._build_index
+    pair_table = soup._pair_table
+    view = soup._view
+
+    def _find_tag(tag, closing, pos, end):
+        # Toda búsqueda de etiquetas sin índice (find, selectores y emparejado de
+        # cierres) pasa por aquí: se cuenta lo recorrido hasta el resultado
+        found = find_tag(tag, closing, pos, end)
+        stats.bytes_scanned += max((end if found == -1 else found) - pos, 0)
+        return found
+
+    def _find_scan(tag, attrs, start):
+        t0 = ticks_us()
+        result = find_scan(tag, attrs, start)
+        stats.add_time("scan", t0)
+        return result
+
+    def _find_indexed(tag, attrs, start):
+        t0 = ticks_us()
+        result = find_indexed(tag, attrs, start)
+        stats.add_time("indexed", t0)
+        return result
+
+    def _build_match(tag, attrs, start_pos, gt_pos, content_end):
+        result = build_match(tag, attrs, start_pos, gt_pos, content_end)
+        stats.candidates += 1
+        if result is not None:
+            stats.matches += 1
+        return result
+
+    def _tree():
+        # Candidatos de select/extract, que no pasan por _build_match
+        return _CountingTree(tree(), stats)
+
+    def _parse_attrs(attrs_str, names=None):
+        t0 = ticks_us()
+        result = parse_attrs(attrs_str, names)
+        stats.attr_parses += 1
+        stats.add_time("attrs", t0)
+        return result
+
+    def _build_index():
+        t0 = ticks_us()
+        result = build_index()
+        stats.index_builds += 1
+        stats.bytes_scanned += soup.length
+        stats.add_time("index", t0)
+        return result
+
+    def _pair_table(tag, until=None):
+        if tag not in soup._pairs:
+            stats.pair_tables += 1
+        t0 = ticks_us()
+        result = pair_table(tag, until)
+        stats.add_time("pairing", t0)
+        return result
+
+    def _view(lo, hi):
+        stats.nested_parsers += 1
+        nested = view(lo, hi)
+        _instrument(nested, stats)
+        return nested
+
+    soup._find_tag = _find_tag
+    soup._find_scan = _find_scan
+    soup._find_indexed = _find_indexed
+    soup._build_match = _build_match
+    soup._tree = _tree
+    soup._parse_attrs = _parse_attrs
+    soup._build_index = _build_index
+    soup._pair_table = _pair_table
+    soup._view = _view
+    for name in ("find", "find_all", "select", "select_one", "extract"):
+        setattr(soup, name, _public_call(soup, stats, name, getattr(soup, name)))
+
+
+class _CountingTree:
+    """
+    Árbol de select/extract que cuenta cada nodo generado como candidato y cada
+    elemento construido como coincidencia; el resto se delega en el árbol real.
+    """
+    def __init__(self, tree, stats):
+        self._tree = tree
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._tree, name)
+
+    def nodes(self, names):
+        # Se cuentan al generarlos: si se deja de consumir el generador, los
+        # candidatos examinados ya están contados
+        stats = self._stats
+        for node in self._tree.nodes(names):
+            stats.candidates += 1
+            yield node
+
+    def element(self, node):
+        self._stats.matches += 1
+        return self._tree.element(node)
+
+
+def _public_call(soup, stats, name, method):
+    """Envuelve una operación pública: tiempo, actividad de la caché y callback."""
+    cache = soup._cache
+
+    def call(*args, **kwargs):
+        # Solo se informa de la operación más externa (select_one llama a select)
+        stats._depth += 1
+        hits = cache.hits
+        misses = cache.misses
+        evictions = cache.evictions
+        t0 = ticks_us()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            stats._depth -= 1
+            if stats._depth == 0:
+                stats.add_time(name, t0)
+                stats.calls += 1
+                stats.cache_hits += cache.hits - hits
+                stats.cache_misses += cache.misses - misses
+                stats.cache_evictions += cache.evictions - evictions
+                if stats.callback is not None:
+                    stats.callback(name, stats)
+    return call
+
+
@@ -0,0 +1,303 @@
+# microbs4_stream.py - Análisis incremental de MicroBS4 (StreamParser, aselect)
+# Se importa la primera vez que se usa StreamParser, aselect o
+# MicroBS4.iter_matches, para que el núcleo no cargue el parser por fragmentos.
+
+from microbs4 import (MicroBS4, Selector, _RAW_TEXT_TAGS, _close_end, _find_name, _is_container,
+                      _name_memo, _raw_text_tag, _tokenize, compile_selector)
+
+
+class StreamParser:
+    """
+    Parser incremental: recibe el HTML por fragmentos (str o bytes) con feed() y
+    devuelve los elementos que coinciden con el selector en cuanto llega su
+    etiqueta de cierre, en orden de documento. Solo conserva el texto desde el
+    inicio del primer elemento pendiente, así que la memoria depende del mayor
+    elemento encontrado y no del tamaño de la página. Tokeniza y resuelve
+    cierres y ancestros igual que el índice, por lo que los resultados son los
+    mismos que los de select().
+    """
+    def __init__(self, selector, encoding="utf-8"):
+        if not isinstance(selector, (str, Selector)):
+            selector = ", ".join(selector)
+        if isinstance(selector, str):
+            selector = compile_selector(selector)
+        self._selector = selector
+        self._tree = _StreamTree(MicroBS4(""))
+        self._raw_tags = [(name, name) for name in _RAW_TEXT_TAGS]
+        self.encoding = encoding
+        self._buf = ""
+        self._base = 0      # posición absoluta de _buf[0]
+        self._pos = 0       # posición absoluta desde la que seguir tokenizando
+        self._pending = b""  # bytes de un carácter UTF-8 partido entre fragmentos
+        self._containers = []  # elementos abiertos que contienen a los siguientes
+        self._open = {}        # nombre en minúsculas -> pila de elementos abiertos (para emparejar cierres)
+        self._matches = []     # elementos que coinciden, pendientes de emitir
+        self._raw_close = None  # etiqueta ("script") cuyo cierre falta si se está dentro de su contenido
+
+    def feed(self, chunk):
+        """Añade un fragmento y devuelve la lista de elementos completados."""
+        if not isinstance(chunk, str):
+            chunk = self._decode(chunk)
+        self._buf += chunk
+        return self._process(False)
+
+    def close(self):
+        """Indica el fin del documento y devuelve los elementos pendientes (sin cierre)."""
+        if self._pending:
+            try:
+                self._buf += self._pending.decode(self.encoding)
+            except UnicodeError:
+                # Entrada cortada en medio de un carácter (cuerpo HTTP truncado):
+                # se sustituye como con errors="replace"
+                self._buf += "�"
+            self._pending = b""
+        return self._process(True)
+
+    def _decode(self, chunk):
+        """Decodifica bytes guardando para el siguiente fragmento un carácter UTF-8 incompleto."""
+        data = self._pending + bytes(chunk)
+        cut = len(data)
+        if self.encoding in ("utf-8", "utf8"):
+            # Retrocede sobre los bytes de continuación hasta el byte inicial
+            i = len(data) - 1
+            while i >= 0 and i > len(data) - 4 and (data[i] & 0xC0) == 0x80:
+                i -= 1
+            if i >= 0 and data[i] >= 0xC0:
+                needed = 2 if data[i] < 0xE0 else 3 if data[i] < 0xF0 else 4
+                if len(data) - i < needed:
+                    cut = i
+        self._pending = data[cut:]
+        return data[:cut].decode(self.encoding)
+
+    def _process(self, final):
+        buf = self._buf
+        base = self._base
+        resume = self._pos - base
+        if self._raw_close is not None:
+            # Dentro del contenido de <script>/<style> solo se busca su cierre
+            resume = self._skip_raw(buf, resume)
+        if self._raw_close is None:
+            raw = None
+            for pos, name_end, gt_pos, closing in _tokenize(buf, resume, len(buf)):
+                resume = pos + 1
+                raw = None
+                if closing:
+                    self._close_tag(buf[pos + 2:name_end].lower(), base + pos)
+                else:
+                    self._open_tag(buf, base, pos, name_end, gt_pos)
+                    if buf[gt_pos - 1] != "/":
+                        raw = _raw_text_tag(buf, pos + 1, name_end, self._raw_tags)
+                        raw_from = gt_pos + 1
+            if raw is not None:
+                # La última etiqueta fue <script>/<style>: su contenido no se tokeniza
+                self._raw_close = raw
+                resume = self._skip_raw(buf, raw_from)
+            if self._raw_close is None:
+                # La tokenización se detuvo en el primer '<' todavía incompleto
+                resume = buf.find("<", resume)
+                if resume == -1:
+                    resume = len(buf)
+        self._pos = base + resume
+
+        found = []
+        matches = self._matches
+        while matches and (final or matches[0].content_end != -1):
+            found.append(self._element(matches.pop(0)))
+
+        keep = matches[0].start if matches else self._pos
+        if keep > base:
+            self._buf = buf[keep - base:]
+            self._base = keep
+        return found
+
+    def _skip_raw(self, buf, resume):
+        """
+        Busca el cierre pendiente de <script>/<style> desde 'resume'. Devuelve su
+        posición o, si aún no ha llegado, desde dónde seguir buscándolo.
+        """
+        close = _find_name(buf, _name_memo(buf, "</", self._raw_close), resume, len(buf))
+        if close != -1:
+            self._raw_close = None
+            return close
+        # El cierre puede llegar partido entre dos fragmentos (hasta el carácter
+        # que sigue al nombre, que hace falta para reconocerlo)
+        return max(resume, len(buf) - len(self._raw_close) - 2)
+
+    def _open_tag(self, buf, base, pos, name_end, gt_pos):
+        name = buf[pos + 1:name_end].lower()
+        is_self_closing = (buf[gt_pos - 1] == "/")
+        containers = self._containers
+        node = _StreamNode(name, base + pos, base + gt_pos,
+                           buf[name_end:gt_pos - 1 if is_self_closing else gt_pos],
+                           containers[-1] if containers else None)
+        if self._selector._matches(self._tree, node):
+            self._matches.append(node)
+        if is_self_closing or not _is_container(name):
+            # Los elementos vacíos (<br>, <img>...) se completan en su '>': no
+            # esperan a un cierre ni retienen el texto que les sigue
+            node.content_end = node.gt
+        else:
+            stack = self._open.get(name)
+            if stack is None:
+                stack = self._open[name] = []
+            stack.append(node)
+            containers.append(node)
+            node.in_containers = True
+
+    def _close_tag(self, name, pos):
+        stack = self._open.get(name)
+        # Un cierre dentro del propio texto de la etiqueta abierta no cuenta
+        if stack and stack[-1].gt < pos:
+            node = stack.pop()
+            node.content_end = pos
+            if node.in_containers:
+                # Cierra también los elementos abiertos dentro sin cierre propio
+                containers = self._containers
+                while True:
+                    top = containers.pop()
+                    top.in_containers = False
+                    if top is node:
+                        break
+
+    def _element(self, node):
+        """Construye el Element sobre un documento propio que contiene solo su HTML."""
+        start = node.start - self._base
+        if node.content_end == -1:
+            raw_html = self._buf[start:]
+            content_end = -1
+        else:
+            if node.content_end == node.gt:
+                end = node.gt + 1 - self._base
+            else:
+                end = _close_end(self._buf, node.content_end - self._base, len(node.name))
+            raw_html = self._buf[start:end]
+            content_end = node.content_end - node.start
+        doc = MicroBS4(raw_html)
+        element, _ = doc._build_element(node.name, 0, node.gt - node.start, content_end)
+        return element
+
+
+class _StreamNode:
+    """Etiqueta de apertura vista por StreamParser (posiciones absolutas)."""
+    __slots__ = ("name", "start", "gt", "attrs_text", "attrs", "parent",
+                 "content_end", "in_containers")
+
+    def __init__(self, name, start, gt, attrs_text, parent):
+        self.name = name
+        self.start = start
+        self.gt = gt
+        self.attrs_text = attrs_text
+        self.attrs = None
+        self.parent = parent
+        self.content_end = -1
+        self.in_containers = False
+
+
+class _StreamTree:
+    """Acceso a nombre, atributos y padre de los nodos de StreamParser para los selectores."""
+    def __init__(self, helper):
+        self.helper = helper
+
+    def name(self, node):
+        return node.name
+
+    def attrs(self, node):
+        if node.attrs is None:
+            node.attrs = self.helper._parse_attrs(node.attrs_text.strip())
+        return node.attrs
+
+    def parent(self, node):
+        return node.parent
+
+
+def _iter_chunks(readable, chunk_size):
+    """Genera fragmentos de un str/bytes, de un objeto con read() o de un iterable."""
+    if isinstance(readable, (str, bytes, bytearray)):
+        for i in range(0, len(readable), chunk_size):
+            yield readable[i:i + chunk_size]
+    elif hasattr(readable, "read"):
+        while True:
+            chunk = readable.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        for chunk in readable:
+            yield chunk
+
+
+def aselect(reader, selector, chunk_size=512, yield_every=4096, encoding="utf-8"):
+    """
+    Versión asíncrona de iter_matches para asyncio/uasyncio:
+
+        async for element in aselect(reader, "a[href]"):
+            ...
+
+    'reader' es un StreamReader (o cualquier objeto con un read(n) asíncrono,
+    como el contenido de una respuesta de aiohttp) o un iterable asíncrono de
+    fragmentos. El documento se analiza por fragmentos de 'chunk_size' bytes
+    con StreamParser y los elementos se generan en cuanto se cierran. Cada
+    'yield_every' bytes analizados se cede el control al bucle de eventos
+    aunque el lector tenga datos de sobra, para que otras tareas no esperen.
+    """
+    return _AsyncMatches(reader, StreamParser(selector, encoding), chunk_size, yield_every)
+
+
+class _AsyncMatches:
+    """
+    Iterador asíncrono de aselect. Es una clase con __anext__ y no un generador
+    asíncrono porque MicroPython no los admite.
+    """
+    def __init__(self, reader, parser, chunk_size, yield_every):
+        self._reader = reader
+        self._parser = parser
+        self._chunk_size = chunk_size
+        self._yield_every = yield_every
+        self._since_yield = 0
+        self._ready = []
+        self._next = 0
+        self._done = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while self._next >= len(self._ready):
+            if self._done:
+                raise StopAsyncIteration
+            chunk = await self._read()
+            if chunk:
+                self._ready = self._parser.feed(chunk)
+                self._since_yield += len(chunk)
+            else:
+                self._ready = self._parser.close()
+                self._done = True
+            self._next = 0
+            if self._since_yield >= self._yield_every:
+                self._since_yield = 0
+                await _sleep0()
+        element = self._ready[self._next]
+        self._next += 1
+        return element
+
+    async def _read(self):
+        reader = self._reader
+        if hasattr(reader, "read"):
+            return await reader.read(self._chunk_size)
+        if not hasattr(reader, "__anext__"):
+            reader = self._reader = reader.__aiter__()
+        try:
+            return await reader.__anext__()
+        except StopAsyncIteration:
+            return None
+
+
+async def _sleep0():
+    """Cede el control al bucle de eventos (asyncio o uasyncio)."""
+    try:
+        import asyncio
+    except ImportError:
+        import uasyncio as asyncio
+    await asyncio.sleep(0)
+
+
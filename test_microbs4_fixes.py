@@ -1,6 +1,6 @@
 
 # test_microbs4_fixes.py - Prueba para verificar las correcciones
-from microbs4 import MicroBS4
+from microbs4 import MicroBS4, ParseStats, StreamParser, aselect, compile_selector, parse_many
 
 def test_find_all_expanded():
     """
@@ -157,6 +157,720 @@ def test_find_all_expanded():
     
     print("\nPrueba completada.")
 
+def test_indexed_mode_matches_scan():
+    """
+    El modo indexado debe devolver exactamente los mismos elementos que la búsqueda por texto
+    """
+    html = '''
+    <div class="list">
+        <ul class="menu">
+            <li class="item">Uno</li>
+            <li class="item selected">Dos <a href="#dos">enlace</a></li>
+            <li class="item">Tres<br/></li>
+        </ul>
+        <div class="item nested"><div class="item">Interno</div></div>
+        <p>Párrafo sin cerrar <span id="precio">10</span>
+    </div>
+    '''
+    queries = [
+        ("div", None), ("div", "item"), ("li", "item"), ("li", "selected"),
+        ("a", None), ("br", None), ("span", None), ("p", None), ("ul", "menu"),
+    ]
+    scan = MicroBS4(html)
+    indexed = MicroBS4(html, indexed=True)
+    for tag, class_name in queries:
+        expected = [e.raw_html for e in scan.find_all(tag, class_name=class_name)]
+        found = [e.raw_html for e in indexed.find_all(tag, class_name=class_name)]
+        assert found == expected, (tag, class_name)
+    assert indexed.select_one("span#precio").get_text() == "10"
+
+
+def test_pairs_resolved_on_demand():
+    """
+    Los cierres se emparejan solo hasta el que se pide: un elemento del
+    principio no obliga a recorrer el resto del documento, y las consultas
+    siguientes continúan el mismo barrido
+    """
+    body = "".join('<ul><li>%d<ul><li>x</li></ul></li><li>y' % i for i in range(2000))
+    html = "<title>t</title><ul>" + body + "</ul>"
+    soup = MicroBS4(html, stats=True)
+    assert soup.find("title").get_text() == "t"
+    assert soup.stats.bytes_scanned < 5000
+    first = soup.find("li")
+    assert first.raw_html == "<li>0<ul><li>x</li></ul></li>"
+    assert soup.stats.bytes_scanned < 10000 and not soup._pairs["li"].done
+    expected = [e.raw_html for e in MicroBS4(html, indexed=True).find_all("li")]
+    assert [e.raw_html for e in soup.find_all("li")] == expected
+    assert soup._pairs["li"].done
+    # Un elemento profundo se empareja desde su propia apertura, sin barrer
+    # las aperturas anteriores (que no coinciden y no necesitan su cierre)
+    deep = "<div>" * 500 + '<div class="leaf">x</div>' + "</div>" * 500
+    soup = MicroBS4(deep)
+    assert soup.find("div", class_name="leaf").raw_html == '<div class="leaf">x</div>'
+    assert soup._pairs["div"].top_level == [] and not soup._pairs["div"].done
+    assert soup.find("div").raw_html == deep
+    assert soup._pairs["div"].top_level == [len(deep)]
+
+
+def test_element_views_share_document():
+    """
+    Los elementos guardan posiciones del documento raíz y las búsquedas anidadas
+    se limitan a su contenido sin crear un parser nuevo sobre una copia
+    """
+    html = '''<ul id="a"><li>1</li><li>2</li></ul><ul id="b"><li>3</li></ul>'''
+    soup = MicroBS4(html)
+    second = soup.find("ul", id="b")
+    assert second.raw_html == '<ul id="b"><li>3</li></ul>'
+    assert second.content == "<li>3</li>"
+    assert [li.get_text() for li in second.find_all("li")] == ["3"]
+    assert second.parser.html is soup.html
+    assert not hasattr(second, "__dict__")
+
+    # content y raw_html se pueden asignar, como antes de guardar posiciones
+    second.raw_html = "<ul>x</ul>"
+    second.content = "<li>4</li><li>5</li>"
+    assert second.raw_html == "<ul>x</ul>"
+    assert [li.get_text() for li in second.find_all("li")] == ["4", "5"]
+
+
+def test_streaming_matches_in_memory():
+    """
+    iter_matches debe devolver los mismos elementos que select() sin importar
+    cómo se parta el documento (incluso dentro de una etiqueta o de un carácter UTF-8)
+    """
+    html = '''<div class="item">Añadido <div>anidado</div></div><p class="item">€ 10</p>
+    <div class="item selected">Dos</div><br/><div>sin cerrar'''
+    soup = MicroBS4(html)
+    for selector in ["div", "div.item", "p.item", "br"]:
+        expected = [e.raw_html for e in soup.select(selector)]
+        for chunk_size in (1, 3, 7, 64):
+            found = [e.raw_html for e in MicroBS4.iter_matches(html.encode(), selector, chunk_size)]
+            assert found == expected, (selector, chunk_size)
+    matches = list(MicroBS4.iter_matches(iter(["<ul><li>a</li>", "<li>b</l", "i></ul>"]), "li"))
+    assert [li.get_text() for li in matches] == ["a", "b"]
+    # Un cuerpo truncado en medio de un carácter UTF-8 no hace fallar close()
+    parser = StreamParser("p")
+    assert parser.feed(b"<p>a\xc3") == []
+    assert [p.get_text() for p in parser.close()] == ["a�"]
+    # Los elementos vacíos sin "/>" se emiten en su '>' y no retienen el búfer
+    parser = StreamParser("img, meta")
+    assert [e.raw_html for e in parser.feed('<head><meta charset="utf-8"></head>')] == [
+        '<meta charset="utf-8">']
+    assert [e.get_attribute("src") for e in parser.feed('<p><img src="a.png">texto ')] == ["a.png"]
+    assert len(parser._buf) < 16 and parser.close() == []
+    # Un </img> sobrante no cambia el elemento: igual que select()
+    html = '<p><img src="a.png"></img>x</p>'
+    expected = [e.raw_html for e in MicroBS4(html).select("img")]
+    assert expected == ['<img src="a.png">']
+    assert [e.raw_html for e in MicroBS4.iter_matches(html, "img", 4)] == expected
+
+
+def test_bounded_result_cache():
+    """
+    La caché no crece con el número de consultas y usa claves canónicas de atributos
+    """
+    html = "<ul>" + "".join(f'<li class="item" id="i{n}">{n}</li>' for n in range(50)) + "</ul>"
+    soup = MicroBS4(html, cache_size=8)
+    for n in range(50):
+        soup.find("li", id=f"i{n}")
+    info = soup.cache_info()
+    assert info["entries"] <= 8 and info["evictions"] > 0
+
+    soup.find("li", attrs={"class": "item", "id": "i3"})
+    hits = soup.cache_info()["hits"]
+    soup.find("li", attrs={"id": "i3", "class": "item"})
+    assert soup.cache_info()["hits"] == hits + 1
+
+    assert len(soup.find_all("li")) == 50
+    assert len(soup.find_all("li")) == 50
+    assert soup.cache_info()["hits"] == hits + 2
+
+
+def test_compiled_selectors():
+    """
+    Selectores compilados: combinadores, grupos, atributos, varias clases y '*'
+    """
+    html = '''
+    <div id="main">
+        <ul class="menu">
+            <li class="item active"><a href="https://a.example">A</a></li>
+            <li class="item"><a href="/b">B</a></li>
+        </ul>
+        <ol><li class="item">C</li></ol>
+        <p class="multi class test">Varias clases</p>
+        <h1>Título</h1><h2>Subtítulo</h2>
+    </div>
+    '''
+    soup = MicroBS4(html)
+    texts = lambda elements: [e.get_text() for e in elements]
+    assert texts(soup.select("ul li")) == ["A", "B"]
+    assert texts(soup.select("div > ol > li")) == ["C"]
+    assert texts(soup.select("div > li")) == []
+    assert texts(soup.select("h1, h2")) == ["Título", "Subtítulo"]
+    assert texts(soup.select(".multi.class.test")) == ["Varias clases"]
+    assert texts(soup.select(".multi.missing")) == []
+    assert texts(soup.select("a[href^=https]")) == ["A"]
+    assert texts(soup.select("li[class~=active] a")) == ["A"]
+    assert len(soup.select("ul > *")) == 2
+    assert soup.select_one("#main").name == "div"
+
+    compiled = compile_selector("li.item")
+    assert compiled is compile_selector("li.item")
+    assert texts(soup.select(compiled)) == ["A", "B", "C"]
+    assert texts(soup.find("ol").select(compiled)) == ["C"]
+
+
+def test_extract_fields_in_one_pass():
+    """
+    extract() devuelve el primer elemento o la lista completa según el campo
+    """
+    html = '''<h1 class="title">Producto</h1>
+    <span id="price">10</span>
+    <ul><li><a href="/a">A</a></li><li><a>sin enlace</a></li><li><a href="/b">B</a></li></ul>'''
+    soup = MicroBS4(html)
+    data = soup.extract({
+        "title": "h1.title",
+        "price": "span#price",
+        "links": ["a[href]"],
+        "missing": "table",
+        "empty": ["table"],
+    })
+    assert data["title"].get_text() == "Producto"
+    assert data["price"].get_text() == "10"
+    assert [a.get_url() for a in data["links"]] == ["/a", "/b"]
+    assert data["missing"] is None and data["empty"] == []
+    assert [a.get_text() for a in data["links"]] == [a.get_text() for a in soup.select("a[href]")]
+    # Varios selectores en la lista se combinan en un grupo, no se descartan
+    data = soup.extract({"both": ["h1", compile_selector("span")], "one": ["li > a"]})
+    assert [e.name for e in data["both"]] == ["h1", "span"]
+    assert len(data["one"]) == 3
+    from microbs4_pool import _selector_spec
+    assert _selector_spec({"both": ["h1", compile_selector("span")]}) == {"both": ["h1, span"]}
+
+
+def test_attribute_parsing():
+    """
+    Atributos con comillas, sin comillas y booleanos; análisis parcial por nombre
+    """
+    soup = MicroBS4("")
+    attrs_str = 'class="a b" id=x data-json=\'{"k": 1}\' disabled title = "con espacios"'
+    assert soup._parse_attrs(attrs_str) == {
+        "class": "a b", "id": "x", "data-json": '{"k": 1}', "disabled": True,
+        "title": "con espacios",
+    }
+    assert soup._parse_attrs(attrs_str, ("id", "class")) == {"class": "a b", "id": "x"}
+
+    doc = MicroBS4('<td class="cell hot" data-v="1">x</td><img src="a.png"/>')
+    cell = doc.find("td", class_name="hot")
+    assert cell.attrs == {"class": "cell hot", "data-v": "1"}
+    assert doc.find("img").get_attribute("src") == "a.png"
+
+
+def test_get_text_and_iter_text():
+    """
+    get_text omite comentarios, <script> y <style> y decodifica entidades;
+    iter_text genera los mismos fragmentos sin unirlos
+    """
+    html = '''<article><h1>Título &amp; más</h1><!-- oculto -->
+    <script>var s = "<p>no</p>";</script><style>p { color: red }</style>
+    <p>Uno&nbsp;&lt;dos&gt; &#39;tres&#x27;</p></article>'''
+    article = MicroBS4(html).find("article")
+    assert article.get_text() == "Título & más Uno <dos> 'tres'"
+    assert article.get_text("|") == "Título|&|más|Uno|<dos>|'tres'"
+    assert "".join(article.iter_text()).split() == article.get_text().split()
+    assert "oculto" not in "".join(MicroBS4(html).iter_text())
+
+
+def test_children_and_navigation():
+    """
+    children() devuelve los hijos directos de cualquier etiqueta (también
+    personalizadas); parent, next_sibling y descendants recorren el mismo árbol
+    """
+    html = '''<div id="root"><p>a</p><!-- comentario -->
+    <my-widget data-x="1"><span>s</span></my-widget>
+    <table><tbody><tr><td>1</td></tr></tbody></table><br/></div>'''
+    soup = MicroBS4(html)
+    root = soup.find("div", id="root")
+    assert [c.name for c in root.children()] == ["p", "my-widget", "table", "br"]
+    assert [c.name for c in root.children("span, table")] == ["table"]
+
+    widget = soup.find("my-widget")
+    assert widget.parent.get_attribute("id") == "root"
+    assert soup.find("p").next_sibling.name == "my-widget"
+    assert widget.next_sibling.name == "table"
+    assert soup.find("br").next_sibling is None
+    assert root.parent is None
+    assert [d.name for d in soup.find("table").descendants] == ["tbody", "tr", "td"]
+    # Sin modo indexado la navegación no construye el índice
+    assert soup._index is None
+
+    # Igual que el índice con etiquetas mal anidadas: </b> cierra también <p>
+    # y </div> cierra <i>, aunque sus cierres propios lleguen después
+    html = "<b><p>x</b><div><i>y</div><br>z</i><span></span></div><em>"
+    for indexed in (False, True):
+        soup = MicroBS4(html, indexed=indexed)
+        p = soup.find("p")
+        assert p.children() == [] and list(p.descendants) == []
+        assert p.parent.name == "b" and p.next_sibling is None
+        assert [c.name for c in soup.find("b").children()] == ["p"]
+        assert soup.find("b").next_sibling.name == "div"
+        assert [d.name for d in soup.find("div").descendants] == ["i"]
+        assert soup.find("br").parent is None and soup.find("br").children() == []
+        assert soup.find("div").next_sibling.name == "br"
+        assert soup.find("br").next_sibling.name == "span"
+
+
+def test_iter_all_without_cap():
+    """
+    find_all no se corta a las 1000 coincidencias; iter_all/iter_select son
+    perezosos y limit detiene la búsqueda en cuanto se alcanza
+    """
+    html = "<table>" + "".join(f'<tr class="row"><td>{i}</td></tr>' for i in range(3000)) + "</table>"
+    soup = MicroBS4(html)
+    rows = soup.find_all("tr")
+    assert len(rows) == 3000
+    assert rows[-1].get_text() == "2999"
+    assert len(soup.select("tr.row")) == 3000
+    assert len(soup.find_all("tr", limit=5)) == 5
+
+    lazy = soup.iter_all("tr", class_name="row")
+    assert next(lazy).get_text() == "0"
+    assert next(lazy).get_text() == "1"
+    first = next(soup.iter_select("table > tr td"))
+    assert first.get_text() == "0"
+    table = soup.find("table")
+    assert [td.get_text() for td, _ in zip(table.iter_select("td"), range(3))] == ["0", "1", "2"]
+
+    # Terminar antes solo cuesta lo recorrido hasta ese punto
+    html = "<body>" + "".join(f'<div class="d"><p>{i}</p><br></div>' for i in range(20000)) + "</body>"
+    for indexed in (False, True):
+        soup = MicroBS4(html, indexed=indexed, stats=True)
+        assert next(soup.iter_select("p")).get_text() == "0"
+        assert soup.select_one("div.d > p").get_text() == "0"
+        assert [d.get_text() for d in soup.find_all("div", limit=3)] == ["0", "1", "2"]
+        assert soup.find("div").next_sibling.get_text() == "1"
+        if not indexed:
+            assert soup.stats.bytes_scanned < len(html) // 50 and soup._index is None
+
+
+def test_bytes_input():
+    """
+    bytes, bytearray y memoryview se analizan sin decodificar el documento y
+    devuelven lo mismo que el texto ya decodificado
+    """
+    html = ('<div id="main" data-price="5 €"><p class="t">Hola &amp; adiós</p>'
+            '<script>var s = "<p>no</p>";</script><ul><li>uno</li><li>dós</li></ul></div>')
+    expected = MicroBS4(html)
+    for indexed in (False, True):
+        for buf in (html.encode(), bytearray(html.encode()), memoryview(html.encode())):
+            soup = MicroBS4(buf, indexed=indexed)
+            div = soup.find("div", id="main")
+            assert div.get_attribute("data-price") == "5 €"
+            assert div.get_text() == expected.find("div").get_text()
+            assert soup.find("p", class_name="t").content == "Hola &amp; adiós"
+            assert [li.raw_html for li in soup.select("ul > li")] == ["<li>uno</li>", "<li>dós</li>"]
+            assert [c.name for c in div.children()] == ["p", "script", "ul"]
+    latin = MicroBS4(html.encode("latin-1", "replace"), encoding="latin-1")
+    assert latin.find("p").get_text() == "Hola & adiós"
+    # Un nombre no ASCII ocupa más bytes que caracteres
+    html = '<div><x-café id=a>hola <x-café id=b>in</x-café></x-café><p>z</p></div>'
+    for indexed in (False, True):
+        for buf in (html.encode(), bytearray(html.encode())):
+            soup = MicroBS4(buf, indexed=indexed)
+            element = soup.find("x-café")
+            assert element.attrs == {"id": "a"} and element.get_text() == "hola in"
+            assert element.raw_html == html[5:-14]
+            assert [e.attrs for e in soup.select("x-café")] == [{"id": "a"}, {"id": "b"}]
+            assert soup.find("x-café", id="b").raw_html == "<x-café id=b>in</x-café>"
+
+
+def test_from_file():
+    """
+    from_file proyecta el archivo (mmap) y da los mismos resultados que el texto
+    """
+    import os
+    import tempfile
+    html = '<ul id="l"><li class="a">uno</li><!-- comentario --><li>dós</li></ul>'
+    fd, path = tempfile.mkstemp(suffix=".html")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(html.encode())
+        with MicroBS4.from_file(path) as soup:
+            assert [li.get_text() for li in soup.find_all("li")] == ["uno", "dós"]
+            assert soup.select_one("ul#l > li.a").raw_html == '<li class="a">uno</li>'
+            assert "".join(soup.iter_text()) == "unodós"
+        assert soup._file is None
+
+        # Si el constructor falla, el archivo no queda abierto
+        import microbs4
+        opened = []
+
+        def tracking_open(*args):
+            f = open(*args)
+            opened.append(f)
+            return f
+        microbs4.open = tracking_open
+        try:
+            MicroBS4.from_file(path, no_existe=True)
+        except TypeError:
+            pass
+        else:
+            assert False
+        finally:
+            del microbs4.open
+        assert len(opened) == 1 and opened[0].closed
+    finally:
+        os.remove(path)
+
+
+def test_parse_many():
+    """
+    parse_many devuelve resultados ligeros en el orden de entrada, iguales con
+    y sin procesos
+    """
+    docs = [f'<h1>Doc {i}</h1><ul><li class="a">{i}</li><li>b</li></ul>' for i in range(20)]
+    serial = parse_many(docs, "li", workers=1)
+    assert parse_many(docs, "li", workers=2, chunksize=3) == serial
+    assert serial[7] == [
+        {"tag": "li", "attrs": {"class": "a"}, "text": "7", "start": 18, "end": 38},
+        {"tag": "li", "attrs": {}, "text": "b", "start": 38, "end": 48},
+    ]
+    fields = parse_many(docs[:2], {"title": "h1", "items": ["li.a"], "none": "p"}, workers=2)
+    assert fields[1]["title"]["text"] == "Doc 1"
+    assert [m["text"] for m in fields[1]["items"]] == ["1"]
+    assert fields[1]["none"] is None
+
+
+def test_parallel_search_matches_serial():
+    """
+    find_all/select con workers deben devolver exactamente lo mismo que en serie,
+    también con etiquetas sin cerrar, auto-cerradas, comentarios y búsquedas anidadas
+    """
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    import random
+
+    def spans(elements):
+        return [(e.name, e._span, e.self_closing) for e in elements]
+
+    def document(rng, depth=0):
+        out = []
+        for _ in range(rng.randint(1, 5)):
+            tag = rng.choice(["div", "li", "span", "br"])
+            attrs = rng.choice(["", ' class="a"', ' class="b a"', ' id="x"'])
+            kind = rng.random()
+            if kind < 0.1:
+                out.append(f"<{tag}{attrs}/>")
+            elif kind < 0.15:
+                out.append(f"<{tag}{attrs}>sin cierre")
+            elif kind < 0.2:
+                out.append("<!-- <div> -->")
+            elif depth < 4:
+                out.append(f"<{tag}{attrs}>" + document(rng, depth + 1) + f"</{tag}>")
+            else:
+                out.append(f"<{tag}{attrs}>hoja</{tag}>")
+        return "".join(out)
+
+    rng = random.Random(15)
+    with ThreadPoolExecutor(2) as pool:
+        for _ in range(150):
+            html = "".join(document(rng) for _ in range(rng.randint(1, 8)))
+            for indexed in (False, True):
+                serial = MicroBS4(html, indexed=indexed, cache_size=0)
+                parallel = MicroBS4(html, indexed=indexed, cache_size=0)
+                for tag in ("div", "li", "br"):
+                    for class_name in (None, "a"):
+                        assert (spans(parallel.find_all(tag, class_name=class_name, workers=pool)) ==
+                                spans(serial.find_all(tag, class_name=class_name))), html
+                for selector in ("div", "li.a, span#x", "*", "div li"):
+                    assert spans(parallel.select(selector, workers=pool)) == spans(serial.select(selector)), html
+                for outer, view in zip(serial.find_all("div"), parallel.find_all("div")):
+                    assert spans(view.find_all("li", workers=pool)) == spans(outer.find_all("li"))
+
+    html = "<table>" + "".join(f'<tr class="r{i % 3}"><td>{i}</td></tr>' for i in range(3000)) + "</table>"
+    soup = MicroBS4(html.encode(), cache_size=0)
+    with ProcessPoolExecutor(2) as pool:
+        assert spans(soup.find_all("tr", class_name="r1", workers=pool)) == spans(soup.find_all("tr", class_name="r1"))
+        assert spans(soup.select("td", workers=pool)) == spans(soup.select("td"))
+    assert len(soup.find_all("td", workers=2)) == 3000
+
+
+def test_aselect_yields_to_event_loop():
+    """
+    aselect genera lo mismo que select leyendo de un StreamReader y cede el
+    control al bucle de eventos mientras analiza
+    """
+    import asyncio
+    html = "<ul>" + "".join(f'<li><a href="/p{i}">é{i}</a></li>' for i in range(2000)) + "</ul>"
+
+    async def main():
+        reader = asyncio.StreamReader()
+        reader.feed_data(html.encode())
+        reader.feed_eof()
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        urls = [e.get_url() async for e in aselect(reader, "a[href]", yield_every=1024)]
+        task.cancel()
+        assert urls == [e.get_url() for e in MicroBS4(html).select("a[href]")]
+        assert len(ticks) > 10
+
+        async def chunks():
+            for i in range(0, len(html), 100):
+                yield html[i:i + 100]
+
+        assert [e.get_text() async for e in aselect(chunks(), "li")][:2] == ["é0", "é1"]
+
+    asyncio.run(main())
+
+
+def test_parse_stats():
+    """
+    Las estadísticas cuentan candidatos, coincidencias, análisis de atributos,
+    caché y vistas anidadas, y avisan al callback tras cada operación pública
+    """
+    html = "<ul>" + "".join(f'<li class="i{i % 3}"><a href="/{i}">x</a></li>' for i in range(30)) + "</ul>"
+    events = []
+    stats = ParseStats(callback=lambda operation, s: events.append((operation, s.calls)))
+    soup = MicroBS4(html, stats=stats)
+    assert len(soup.find_all("li", class_name="i1")) == 10
+    assert stats.candidates == 30 and stats.matches == 10 and stats.attr_parses == 30
+    # Solo se buscan los cierres de los candidatos que coinciden: el recorrido
+    # salta el contenido de las coincidencias y no vuelve sobre él
+    assert stats.pair_tables == 1 and len(html) // 2 < stats.bytes_scanned < len(html)
+    soup.find_all("li", class_name="i1")
+    assert stats.cache_hits == 1
+    soup.select_one("li.i2 a")
+    soup.find("ul").find_all("a")
+    # Sin modo indexado los selectores no construyen el índice
+    assert stats.nested_parsers == 1 and stats.index_builds == 0 and soup._index is None
+    assert events == [("find_all", 1), ("find_all", 2), ("select_one", 3), ("find", 4), ("find_all", 5)]
+    assert set(stats.as_dict()["times_us"]) >= {"scan", "attrs", "pairing", "find_all"}
+
+    # Los selectores cuentan también los candidatos que descartan
+    candidates = stats.candidates
+    matches = stats.matches
+    assert len(soup.select("li.i1")) == 10
+    assert stats.candidates - candidates == 30 and stats.matches - matches == 10
+    soup.extract({"links": ["li.i0 a"], "first": "li.i2"})
+    assert stats.candidates - candidates == 30 + 60 and stats.matches - matches == 10 + 11
+
+    assert MicroBS4(html).stats is None
+    indexed = MicroBS4(html, indexed=True, stats=True)
+    assert indexed.stats.calls == 0
+    indexed.select("li a")
+    assert indexed.stats.index_builds == 1 and "index" in indexed.stats.times_us
+
+
+def test_script_style_comment_regions_skipped():
+    """
+    Las etiquetas dentro de <script>, <style>, comentarios y CDATA no son
+    etiquetas reales: ni se encuentran ni cuentan para emparejar cierres
+    """
+    html = ('''<div id="app"><script>var t = '<div class="card"></div></div>';</script>'''
+            '''<style>div > p { color: red }</style><!-- <div class="card">viejo</div> -->'''
+            '''<![CDATA[ </div> <p> ]]><div class="card"><p>real</p></div></div>''')
+    for indexed in (False, True):
+        soup = MicroBS4(html, indexed=indexed)
+        cards = soup.find_all("div", class_name="card")
+        assert [c.get_text() for c in cards] == ["real"], indexed
+        assert soup.find("div", id="app").raw_html == html
+        assert [p.get_text() for p in soup.find_all("p")] == ["real"]
+        assert soup.find("script").content.startswith("var t")
+    assert [e.get_text() for e in MicroBS4(html).select("div.card")] == ["real"]
+    for chunk_size in (1, 7, 64):
+        found = list(MicroBS4.iter_matches(html, "div.card p", chunk_size=chunk_size))
+        assert [e.get_text() for e in found] == ["real"], chunk_size
+
+
+def test_compact_tag_index():
+    """
+    El índice guarda el árbol en columnas de enteros y nombres internados, y las
+    consultas dan los mismos resultados que el modo de búsqueda en el texto
+    """
+    html = ('<ul id="menu"><li class="a">uno</li><li><b>dos</b><br></li>'
+            '<li class="a"><ul><li>tres</li></ul></li></ul><p>fin</p>')
+    soup = MicroBS4(html, indexed=True)
+    index = soup._get_index()
+    assert not isinstance(index.starts, list)
+    assert index.tag_names == ["ul", "li", "b", "br", "p"]
+    assert [index.name(node) for node in index.by_name["li"]] == ["li"] * 4
+    plain = MicroBS4(html)
+    for selector in ("li.a", "ul li", "ul > li > ul li", "li b", "p"):
+        assert ([e.raw_html for e in soup.select(selector)] ==
+                [e.raw_html for e in plain.select(selector)]), selector
+    assert soup.find("li", class_name="a").get_text() == "uno"
+    menu = soup.find("ul", id="menu")
+    assert [c.name for c in menu.children()] == ["li", "li", "li"]
+    assert [e.name for e in menu.descendants] == ["li", "li", "b", "br", "li", "ul", "li"]
+    assert menu.next_sibling.name == "p"
+    assert soup.find("b").parent.name == "li"
+
+
+def test_optional_modules_load_lazily():
+    """
+    Importar microbs4 carga solo el núcleo; StreamParser, aselect, parse_many,
+    ParseStats y las búsquedas que los usan cargan su módulo la primera vez
+    """
+    import os
+    import subprocess
+    import sys
+    code = (
+        "import sys\n"
+        "def loaded():\n"
+        "    return sorted(m for m in sys.modules if m.startswith('microbs4_'))\n"
+        "import microbs4\n"
+        "print(loaded())\n"
+        "microbs4.MicroBS4('<p>a</p>').select('p')\n"
+        "print(loaded())\n"
+        "microbs4.MicroBS4('<p>a</p>', stats=True).find('p')\n"
+        "print(loaded())\n"
+        "from microbs4 import StreamParser, parse_many\n"
+        "print(loaded())\n"
+        "print(microbs4.StreamParser is StreamParser)\n"
+    )
+    output = subprocess.check_output([sys.executable, "-c", code],
+                                     cwd=os.path.dirname(os.path.abspath(__file__)), text=True)
+    assert output.split("\n")[:5] == [
+        "[]",
+        "[]",
+        "['microbs4_stats']",
+        "['microbs4_pool', 'microbs4_stats', 'microbs4_stream']",
+        "True",
+    ]
+    import microbs4
+    try:
+        microbs4.no_existe
+    except AttributeError:
+        pass
+    else:
+        assert False
+
+
+def test_case_insensitive_tags():
+    """
+    Los nombres de etiqueta se comparan sin distinguir mayúsculas en la búsqueda
+    con str.find, en el índice y en StreamParser, sin tocar los valores de los atributos
+    """
+    html = """<DIV class="Caja"><Ul><LI>uno</li><li>dos<LI>tres</Li ></LI></UL></DIV>
+    <SCRIPT>var s = "<li>no</li>";</script><Div>dos</div><link rel="x"><p>a < b</p>"""
+    for doc in (html, html.encode()):
+        for indexed in (False, True):
+            soup = MicroBS4(doc, indexed=indexed)
+            divs = soup.find_all("div")
+            assert [d.name for d in divs] == ["div", "div"]
+            assert divs[0].attrs == {"class": "Caja"}
+            assert soup.find("DIV", class_name="Caja") is not None
+            assert [li.get_text() for li in soup.find_all("li")] == ["uno", "dostres"]
+            items = soup.select("li")
+            assert [li.get_text() for li in items] == ["uno", "dostres", "tres"]
+            assert items[2].raw_html == "<LI>tres</Li >"
+            assert [e.get_text() for e in soup.select("UL > li")] == ["uno", "dostres"]
+            assert soup.find_all("script")[0].name == "script"
+            assert len(soup.find_all("link")) == 1
+            assert [c.name for c in soup.find("ul").children()] == ["li", "li"]
+            # Nombres que siguen en mayúsculas tras una minúscula, también al emparejar cierres
+            inner = "<div id=a><dIV id=b>x</div></div>"
+            nested = MicroBS4(inner if isinstance(doc, str) else inner.encode(), indexed=indexed)
+            assert [d.raw_html for d in nested.find_all("div")] == [inner]
+            assert nested.find("div").find("div").attrs == {"id": "b"}
+            assert [d.attrs["id"] for d in nested.select("div div")] == ["b"]
+            assert soup.find("") is None and soup.find_all("") == []
+    expected = [e.raw_html for e in MicroBS4(html).select("li")]
+    for chunk_size in (1, 5, 64):
+        found = [e.raw_html for e in MicroBS4.iter_matches(html.encode(), "LI", chunk_size)]
+        assert found == expected, chunk_size
+
+
+def test_disk_cache():
+    """
+    DiskCache responde find_all/select de un documento ya visto sin analizarlo,
+    persiste entre instancias y expulsa entradas al superar su tamaño
+    """
+    import os
+    import tempfile
+    from microbs4 import DiskCache
+    html = """<ul><li class="a">uno</li><li class="a b">dos <br/></li><li>tres</li></ul>
+    <p id="x">€ fin</p>"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache")
+        cache = DiskCache(path)
+        expected = MicroBS4(html)
+        MicroBS4(html, disk_cache=cache).select("li.a")
+        MicroBS4(html, disk_cache=cache).find_all("li", class_name="a")
+        assert cache.info()["entries"] == 2 and cache.misses == 2
+
+        for doc in (html, html.encode()):
+            soup = MicroBS4(doc, disk_cache=DiskCache(path))
+            found = soup.select("li.a")
+            soup.find_all("li", class_name="a")
+            if isinstance(doc, str):
+                # Las respuestas del disco no analizan el documento
+                assert soup.disk_cache.hits == 2
+                assert soup._pairs == {} and soup._index is None
+            else:
+                # Las posiciones de bytes son otras: otro hash, otra entrada
+                assert soup.disk_cache.hits == 0
+            assert [e.raw_html for e in found] == [e.raw_html for e in expected.select("li.a")]
+            assert found[1].attrs == {"class": "a b"}
+            assert found[1].get_text() == "dos"
+            assert [e.name for e in found[1].children()] == ["br"]
+            assert soup.find_all("li", class_name="a")[0].get_text() == "uno"
+
+        # find() de una etiqueta llamada "select" o "all" no va al disco
+        cache = DiskCache(path)
+        entries = cache.info()["entries"]
+        form = '<form><select name="s"><option>1</option></select></form><all>x</all>'
+        soup = MicroBS4(form, disk_cache=cache)
+        assert soup.find("select").get_attribute("name") == "s"
+        assert soup.find("all").get_text() == "x"
+        assert soup.find("select").name == "select"
+        assert cache.info()["entries"] == entries
+
+        # Sin resultados también se guarda; con otro contenido no hay acierto
+        cache = DiskCache(path)
+        assert MicroBS4(html, disk_cache=cache).select("table") == []
+        assert MicroBS4(html, disk_cache=cache).select("table") == []
+        assert cache.hits == 1
+        MicroBS4(html + " ", disk_cache=cache).select("li.a")
+        assert cache.hits == 1
+
+        # Límite de tamaño: se borran primero las entradas más antiguas
+        small = DiskCache(os.path.join(tmp, "small"), max_bytes=300)
+        for tag in ("li", "ul", "p", "br"):
+            MicroBS4(html, disk_cache=small).find_all(tag)
+        assert small.evictions > 0 and small.bytes <= 300
+        assert len(os.listdir(small.path)) == len(small)
+        small.clear()
+        assert os.listdir(small.path) == [] and small.bytes == 0
+
+
 # Ejecutar la prueba
 if __name__ == "__main__":
     test_find_all_expanded()
+    test_indexed_mode_matches_scan()
+    test_pairs_resolved_on_demand()
+    test_element_views_share_document()
+    test_streaming_matches_in_memory()
+    test_bounded_result_cache()
+    test_compiled_selectors()
+    test_extract_fields_in_one_pass()
+    test_attribute_parsing()
+    test_get_text_and_iter_text()
+    test_children_and_navigation()
+    test_iter_all_without_cap()
+    test_bytes_input()
+    test_from_file()
+    test_parse_many()
+    test_parallel_search_matches_serial()
+    test_aselect_yields_to_event_loop()
+    test_parse_stats()
+    test_script_style_comment_regions_skipped()
+    test_compact_tag_index()
+    test_optional_modules_load_lazily()
+    test_case_insensitive_tags()
+    test_disk_cache()
@@ -0,0 +1,87 @@
+# build_mpy.py - Compila los módulos de MicroBS4 a .mpy con mpy-cross
+#
+# Los .mpy se cargan sin compilar en la placa: el arranque no paga el análisis
+# del código fuente ni fragmenta el heap con el compilador. Se escriben en
+# build/ (o en --out) y se copian a la placa en lugar de los .py:
+#
+#   python tools/build_mpy.py                              # bytecode, cualquier puerto
+#   python tools/build_mpy.py --native --march xtensawin   # ESP32, núcleo nativo
+#   mpremote cp build/*.mpy :
+#
+# Con --native el núcleo (microbs4.py) se compila con el emisor nativo
+# (-X emit=native) para la arquitectura de --march: los bucles de búsqueda no
+# pasan por el intérprete de bytecode, pero el .mpy ocupa unas nueve veces más
+# (unos 125 KB en x64), así que solo conviene en placas con flash de sobra. Los
+# módulos opcionales siempre son bytecode. El código fuente no lleva
+# decoradores @micropython.native porque impedirían compilarlo como bytecode y
+# cargarlo en puertos sin emisor nativo.
+# Usa el mpy-cross del PATH o el paquete de pip mpy-cross (--mpy-cross para
+# otro); su versión debe coincidir con la del firmware.
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Núcleo: se importa siempre y contiene los bucles de búsqueda
+CORE = ("microbs4.py",)
+# Módulos que microbs4 importa al usar la función correspondiente
+OPTIONAL = ("microbs4_stream.py", "microbs4_pool.py", "microbs4_stats.py",
+            "microbs4_cache.py")
+
+
+def mpy_cross_command(path):
+    """Orden para ejecutar mpy-cross: el indicado, el del PATH o el paquete de pip."""
+    if path:
+        return [path]
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        candidate = os.path.join(directory, "mpy-cross")
+        if os.access(candidate, os.X_OK):
+            return [candidate]
+    return [sys.executable, "-m", "mpy_cross"]
+
+
+def build(out, march=None, mpy_cross=None, native=False):
+    """Compila cada módulo a 'out'/<módulo>.mpy y devuelve las rutas generadas."""
+    command = mpy_cross_command(mpy_cross)
+    os.makedirs(out, exist_ok=True)
+    built = []
+    for name in CORE + OPTIONAL:
+        target = os.path.join(out, name[:-3] + ".mpy")
+        args = command + ["-O3", "-s", name, "-o", target]
+        if march:
+            args.append("-march=" + march)
+        if native and name in CORE:
+            args.append("-X")
+            args.append("emit=native")
+        args.append(os.path.join(ROOT, name))
+        subprocess.check_call(args)
+        built.append(target)
+    return built
+
+
+def main(argv):
+    options = {"--out": os.path.join(ROOT, "build"), "--march": None, "--mpy-cross": None}
+    native = False
+    i = 0
+    while i < len(argv):
+        if argv[i] == "--native":
+            native = True
+            i += 1
+        elif argv[i] in options and i + 1 < len(argv):
+            options[argv[i]] = argv[i + 1]
+            i += 2
+        else:
+            print("uso: build_mpy.py [--out DIR] [--march ARQ] [--native] [--mpy-cross RUTA]")
+            return 2
+    if native and not options["--march"]:
+        print("--native necesita --march (x64, armv7m, xtensa, xtensawin, rv32imc...)")
+        return 2
+    for path in build(options["--out"], options["--march"], options["--mpy-cross"], native):
+        print("%-40s %6d bytes" % (path, os.path.getsize(path)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))